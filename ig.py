@@ -1,13 +1,43 @@
-import re
-import json
+import sys
+
+# Headless runs must never pay for importing Tk. ig_cli.py becomes the main
+# module, so spawned pool workers re-import it rather than this file.
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    import os
+    import runpy
+    sys.argv = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "ig_cli.py")] + [arg for arg in sys.argv[1:] if arg != "--headless"]
+    runpy.run_path(sys.argv[0], run_name="__main__")
+    sys.exit(0)
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+import tkinter.font as tkfont
 import webbrowser
 import configparser
-import datetime
 import threading
 import queue
 import os
+import sqlite3
+import time
+import datetime
+
+from ig_engine import (
+    RESULT_VIEWS, AudienceMatrix, EventChannel, ExportEngine, JSONLinesTrace, ParseCache, RelationshipResults, SearchEngine,
+    SnapshotStore, WhitelistMatcher, auto_save_name, calendar_edges, extract_archive, extract_followers, extract_usernames, load_whitelist,
+)
+
+HISTORY_ACCOUNT = "default"
+WHITELIST_POLL_MS = 1000
+DATE_RELATIONSHIPS = {"Any date": None, "They followed you": "followers", "You followed them": "following"}
+DATE_RANGES = {  # (newer than, older than), in days
+    "in the last 7 days": (7, None),
+    "in the last 30 days": (30, None),
+    "in the last 90 days": (90, None),
+    "in the last year": (365, None),
+    "more than 90 days ago": (None, 90),
+    "more than a year ago": (None, 365),
+    "more than 2 years ago": (None, 730),
+}
 
 # -------- THEMES --------
 LIGHT = {
@@ -46,6 +76,349 @@ class Tooltip:
             self.tooltip.destroy()
             self.tooltip = None
 
+class VirtualList(ttk.Frame):
+    """Listbox that only ever holds the rows currently on screen.
+
+    The backing sequence is kept by reference, so swapping it costs the same
+    for ten rows or ten million. Scrolling re-renders the visible window, so
+    the selection, its anchor and the cursor are tracked as absolute row
+    indices and the mouse and arrow-key bindings are handled here rather than
+    by the Listbox, whose anchor resets on every render.
+    """
+    def __init__(self, master, **listbox_options):
+        super().__init__(master)
+        self.data = []
+        self.top = 0
+        self.rows = 1
+        self.selected = set()
+        self.anchor = 0
+        self.cursor = 0
+        
+        self.scrollbar = ttk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.listbox = tk.Listbox(self, selectmode=tk.EXTENDED, exportselection=False, **listbox_options)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.line_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1 + 2 * int(self.listbox.cget("selectborderwidth"))
+        
+        self.listbox.bind("<Configure>", self.on_resize)
+        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        self.listbox.bind("<Button-1>", lambda e: self.click(e, "set"))
+        self.listbox.bind("<Control-Button-1>", lambda e: self.click(e, "toggle"))
+        self.listbox.bind("<Shift-Button-1>", lambda e: self.click(e, "extend"))
+        self.listbox.bind("<B1-Motion>", lambda e: self.click(e, "extend"))
+        self.listbox.bind("<Up>", lambda e: self.move(-1, extend=False))
+        self.listbox.bind("<Down>", lambda e: self.move(1, extend=False))
+        self.listbox.bind("<Shift-Up>", lambda e: self.move(-1, extend=True))
+        self.listbox.bind("<Shift-Down>", lambda e: self.move(1, extend=True))
+        self.listbox.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.listbox.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll(3))
+        self.listbox.bind("<Prior>", lambda e: self.scroll(-self.rows))
+        self.listbox.bind("<Next>", lambda e: self.scroll(self.rows))
+        
+    def set_data(self, data):
+        self.data = data
+        self.top = 0
+        self.selected = set()
+        self.anchor = self.cursor = 0
+        self.render()
+        
+    def selected_items(self):
+        return [self.data[i] for i in sorted(self.selected) if i < len(self.data)]
+        
+    def render(self):
+        self.top = max(0, min(self.top, len(self.data) - self.rows))
+        window = self.data[self.top:self.top + self.rows]
+        self.listbox.delete(0, tk.END)
+        if window:
+            self.listbox.insert(tk.END, *window)
+        for i in range(len(window)):
+            if self.top + i in self.selected:
+                self.listbox.selection_set(i)
+        if self.top <= self.cursor < self.top + len(window):
+            self.listbox.activate(self.cursor - self.top)
+        if self.data:
+            self.scrollbar.set(self.top / len(self.data), min(1.0, (self.top + self.rows) / len(self.data)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        
+    def scroll(self, rows):
+        self.top += rows
+        self.render()
+        return "break"
+        
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.data))
+        elif args[0] == "scroll":
+            self.top += int(args[1]) * (self.rows if args[2] == "pages" else 1)
+        self.render()
+        
+    def on_resize(self, event):
+        rows = max(1, event.height // self.line_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+        
+    def select(self, row, mode):
+        if mode == "extend":
+            self.selected = set(range(min(self.anchor, row), max(self.anchor, row) + 1))
+        else:
+            if mode == "toggle":
+                self.selected ^= {row}
+            else:
+                self.selected = {row}
+            self.anchor = row
+        self.cursor = row
+        # Keep the cursor on screen; this is what scrolls while dragging or arrowing past an edge
+        if row < self.top:
+            self.top = row
+        elif row >= self.top + self.rows:
+            self.top = row - self.rows + 1
+        self.render()
+        
+    def click(self, event, mode):
+        self.listbox.focus_set()
+        if self.data:
+            if event.y < 0:
+                row = self.top - 1
+            elif event.y >= self.listbox.winfo_height():
+                row = self.top + self.rows
+            else:
+                row = self.top + self.listbox.nearest(event.y)
+            self.select(max(0, min(row, len(self.data) - 1)), mode)
+        return "break"
+        
+    def move(self, rows, extend):
+        if self.data:
+            self.select(max(0, min(self.cursor + rows, len(self.data) - 1)), "extend" if extend else "set")
+        return "break"
+        
+    def on_select(self, event):
+        self.selected.difference_update(range(self.top, self.top + self.listbox.size()))
+        self.selected.update(self.top + i for i in self.listbox.curselection())
+
+class HistoryWindow(tk.Toplevel):
+    def __init__(self, master, store, account, theme):
+        super().__init__(master)
+        self.title("Snapshot History")
+        self.geometry("520x600")
+        self.configure(bg=theme["bg"])
+        self.store = store
+        self.account = account
+        
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame, text="Follower snapshots (churn over time)").pack(anchor="w")
+        self.tree = ttk.Treeview(frame, columns=("taken", "size", "added", "removed"), show="headings", height=8, selectmode="browse")
+        for column, text, width in (("taken", "Taken", 180), ("size", "Followers", 90), ("added", "New", 80), ("removed", "Lost", 80)):
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=width, anchor="w")
+        self.tree.pack(fill=tk.X, pady=5)
+        for snapshot_id, taken_at, size, added, removed in store.churn(account):
+            self.tree.insert("", tk.END, iid=str(snapshot_id), values=(taken_at, size, f"+{added}", f"-{removed}"))
+        
+        actions_frame = ttk.Frame(frame)
+        actions_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(actions_frame, text="Lost Followers Since Selected", command=lambda: self.show_changes(lost=True)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(actions_frame, text="New Followers Since Selected", command=lambda: self.show_changes(lost=False)).pack(side=tk.LEFT, padx=5)
+        
+        self.result_list = VirtualList(frame, font=("Consolas", 12))
+        self.result_list.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.result_list.listbox.configure(bg=theme["list_bg"], fg=theme["list_fg"],
+                                           selectbackground=theme["accent"], selectforeground=theme["btn_fg"])
+        
+        self.status = ttk.Label(frame, text=f"{len(self.tree.get_children())} snapshot(s)", anchor="w")
+        self.status.pack(fill=tk.X)
+        
+    def show_changes(self, lost):
+        selected = self.tree.selection()
+        if not selected:
+            self.status.config(text="Select a snapshot first")
+            return
+        since = int(selected[0])
+        if lost:
+            usernames = self.store.lost_followers(self.account, since)
+        else:
+            usernames = self.store.new_followers(self.account, since)
+        self.result_list.set_data(usernames)
+        taken_at = self.tree.set(selected[0], "taken")
+        self.status.config(text=f"{len(usernames)} {'lost' if lost else 'new'} follower(s) since {taken_at}")
+
+class FollowDatesWindow(tk.Toplevel):
+    def __init__(self, master, results, mode, theme):
+        super().__init__(master)
+        self.title("Follow Dates")
+        self.geometry("620x400")
+        self.configure(bg=theme["bg"])
+        self.results = results
+        self.mode = mode
+        self.theme = theme
+        
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        controls = ttk.Frame(frame)
+        controls.pack(fill=tk.X)
+        ttk.Label(controls, text=f"{mode} by date:").pack(side=tk.LEFT)
+        # Unfollowers never followed you, so only the date you followed them exists
+        self.relationship = tk.StringVar(value="You followed them" if mode == "Unfollowers" else "They followed you")
+        relationship_combo = ttk.Combobox(controls, textvariable=self.relationship, state="readonly", width=18,
+                                          values=[label for label, relationship in DATE_RELATIONSHIPS.items() if relationship])
+        relationship_combo.pack(side=tk.LEFT, padx=5)
+        relationship_combo.bind("<<ComboboxSelected>>", self.draw)
+        
+        self.canvas = tk.Canvas(frame, bg=theme["list_bg"], highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.canvas.bind("<Configure>", self.draw)
+        
+        self.status = ttk.Label(frame, anchor="w")
+        self.status.pack(fill=tk.X)
+        
+    def draw(self, *args):
+        self.canvas.delete("all")
+        index = self.results.time_index(DATE_RELATIONSHIPS[self.relationship.get()], self.mode)
+        if not len(index):
+            self.status.config(text=f"None of the {self.mode.lower()} have a date for \"{self.relationship.get()}\" in these files")
+            return
+        first, last = index.times[0], index.times[-1]
+        unit = "month" if last - first < 4 * 365 * 86400 else "year"
+        edges = calendar_edges(first, last, unit)
+        counts = index.histogram(edges)
+        
+        width, height = max(self.canvas.winfo_width(), 100), max(self.canvas.winfo_height(), 100)
+        bar = (width - 20) / len(counts)
+        step = max(1, int(60 // bar) + 1)  # keep axis labels ~60px apart
+        label_format = "%Y-%m" if unit == "month" else "%Y"
+        for i, count in enumerate(counts):
+            x = 10 + i * bar
+            top = height - 20 - (height - 40) * count / max(counts)
+            self.canvas.create_rectangle(x + 1, top, x + bar - 1, height - 20, fill=self.theme["accent"], width=0)
+            if i % step == 0:
+                label = datetime.datetime.fromtimestamp(edges[i], datetime.timezone.utc).strftime(label_format)
+                self.canvas.create_text(x, height - 10, text=label, anchor="w", fill=self.theme["list_fg"], font=("Arial", 8))
+        
+        day = lambda ts: datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime("%Y-%m-%d")
+        self.status.config(text=f"{len(index):,} dated entries from {day(first)} to {day(last)}; busiest {unit}: {max(counts):,}")
+
+class OverlapWindow(tk.Toplevel):
+    def __init__(self, master, cache, theme):
+        super().__init__(master)
+        self.title("Audience Overlap")
+        self.geometry("640x640")
+        self.configure(bg=theme["bg"])
+        self.cache = cache
+        self.accounts = {}
+        self.matrix = None
+        self.queue = queue.Queue()
+        self.bind("<<OverlapReady>>", self.on_ready)
+        
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        files_frame = ttk.Frame(frame)
+        files_frame.pack(fill=tk.X)
+        ttk.Button(files_frame, text="Add Exports...", command=self.add_exports).pack(side=tk.LEFT, padx=5)
+        ttk.Button(files_frame, text="Clear", command=self.clear).pack(side=tk.LEFT, padx=5)
+        self.btn_analyze = ttk.Button(files_frame, text="Analyze", command=self.analyze)
+        self.btn_analyze.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(frame, text="Follower overlap (Jaccard)").pack(anchor="w", pady=(10, 0))
+        self.tree = ttk.Treeview(frame, show="headings", height=8)
+        self.tree.pack(fill=tk.X, pady=5)
+        
+        query_frame = ttk.Frame(frame)
+        query_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(query_frame, text="Query:").pack(side=tk.LEFT, padx=5)
+        self.query_var = tk.StringVar()
+        query_entry = ttk.Entry(query_frame, textvariable=self.query_var)
+        query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        query_entry.bind("<Return>", self.run_query)
+        Tooltip(query_entry, "Combine accounts with & | ^ - ~, quote names with spaces; others(A, B) is every other account")
+        ttk.Button(query_frame, text="Run", command=self.run_query).pack(side=tk.LEFT, padx=5)
+        
+        self.result_list = VirtualList(frame, font=("Consolas", 12))
+        self.result_list.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.result_list.listbox.configure(bg=theme["list_bg"], fg=theme["list_fg"],
+                                           selectbackground=theme["accent"], selectforeground=theme["btn_fg"])
+        
+        self.status = ttk.Label(frame, text="Add one export (ZIP or followers file) per account", anchor="w")
+        self.status.pack(fill=tk.X)
+        
+    def add_exports(self):
+        paths = filedialog.askopenfilenames(parent=self, title="Select Exports",
+                                            filetypes=[("Exports", "*.zip *.html *.json")])
+        for path in paths:
+            # Loose followers files are named after the folder holding them
+            base = os.path.splitext(os.path.basename(path))[0] if path.endswith(".zip") else os.path.basename(os.path.dirname(path))
+            label, n = base, 1
+            while label in self.accounts:
+                n += 1
+                label = f"{base}_{n}"
+            self.accounts[label] = path
+        self.status.config(text=f"{len(self.accounts)} account(s): {', '.join(self.accounts)}")
+        
+    def clear(self):
+        self.accounts = {}
+        self.matrix = None
+        self.tree.delete(*self.tree.get_children())
+        self.result_list.set_data([])
+        self.status.config(text="Add one export (ZIP or followers file) per account")
+        
+    def analyze(self):
+        if len(self.accounts) < 2:
+            self.status.config(text="Add at least two accounts to compare")
+            return
+        self.btn_analyze.state(["disabled"])
+        self.status.config(text=f"Loading {len(self.accounts)} account(s)...")
+        threading.Thread(target=self.analyze_worker, args=(dict(self.accounts),), daemon=True).start()
+        
+    def analyze_worker(self, accounts):
+        try:
+            audiences = {label: extract_followers(path, self.cache) for label, path in accounts.items()}
+            matrix = AudienceMatrix(audiences)
+            self.queue.put((matrix, matrix.jaccard(), None))
+        except Exception as e:
+            self.queue.put((None, None, e))
+        try:
+            self.event_generate("<<OverlapReady>>", when="tail")
+        except (tk.TclError, RuntimeError):
+            pass  # window already closed
+        
+    def on_ready(self, *args):
+        matrix, jaccard, error = self.queue.get_nowait()
+        self.btn_analyze.state(["!disabled"])
+        if error:
+            self.status.config(text="Analysis failed")
+            messagebox.showerror("Error", f"Failed to analyze exports: {error}", parent=self)
+            return
+        self.matrix = matrix
+        columns = ["account"] + [str(i) for i in range(len(matrix.labels))]
+        self.tree.configure(columns=columns)
+        self.tree.heading("account", text="Account")
+        self.tree.column("account", width=140, anchor="w")
+        for i, label in enumerate(matrix.labels):
+            self.tree.heading(str(i), text=label)
+            self.tree.column(str(i), width=80, anchor="e")
+        self.tree.delete(*self.tree.get_children())
+        for label, row in zip(matrix.labels, jaccard):
+            self.tree.insert("", tk.END, values=[f"{label} ({matrix.sizes[label]:,})"] + [f"{value:.1%}" for value in row])
+        self.status.config(text=f"{len(matrix.labels)} accounts, {len(matrix.table):,} distinct followers")
+        
+    def run_query(self, *args):
+        if self.matrix is None:
+            self.status.config(text="Analyze the accounts first")
+            return
+        try:
+            usernames = self.matrix.query(self.query_var.get())
+        except ValueError as e:
+            self.status.config(text=str(e))
+            return
+        self.result_list.set_data(usernames)
+        self.status.config(text=f"{len(usernames):,} follower(s) match")
+
 class InstagramUnfollowApp:
     def __init__(self, root):
         self.root = root
@@ -57,22 +430,40 @@ class InstagramUnfollowApp:
         self.followers_file = None
         self.following_file = None
         self.whitelist_file = None
+        self.archive_file = None
+        self.trace_file = None
         self.all_results = []
         self.followers = set()
         self.following = set()
-        self.whitelist = set()
+        self.whitelist = WhitelistMatcher()
+        self.whitelist_mtime = None
+        self.whitelist_generation = 0
+        self.results = RelationshipResults()
         self.mode = tk.StringVar(value="Unfollowers")
         self.use_regex = tk.BooleanVar(value=False)
+        self.date_relationship = tk.StringVar(value="Any date")
+        self.date_range = tk.StringVar(value="in the last 30 days")
         
         self.config = configparser.ConfigParser()
         self.config_file = "config.ini"
         self.load_config()
         
+        data_dir = os.path.dirname(os.path.abspath(self.config_file))
+        self.cache = ParseCache(os.path.join(data_dir, "cache"))
+        self.history = SnapshotStore(os.path.join(data_dir, "history.sqlite"))
         self.queue = queue.Queue()
+        self.root.bind("<<WorkerEvent>>", self.on_worker_event)
+        self.exporter = ExportEngine(self.post_event)
+        self.auto_save_file = None
+        self.search_queue = queue.Queue()
+        self.search_generation = None
+        self.search_polling = False
+        self.searcher = SearchEngine(lambda *result: self.search_queue.put(result))
         
         self.setup_ui()
         self.apply_theme()
         self.setup_keyboard_shortcuts()
+        self.watch_whitelist()
         
     def load_config(self):
         if os.path.exists(self.config_file):
@@ -81,12 +472,16 @@ class InstagramUnfollowApp:
                 self.followers_file = self.config["Paths"].get("followers", None)
                 self.following_file = self.config["Paths"].get("following", None)
                 self.whitelist_file = self.config["Paths"].get("whitelist", None)
+                self.archive_file = self.config["Paths"].get("archive", None)
+            if "Diagnostics" in self.config:
+                self.trace_file = self.config["Diagnostics"].get("trace_file", None) or None
         
     def save_config(self):
         self.config["Paths"] = {
             "followers": self.followers_file or "",
             "following": self.following_file or "",
-            "whitelist": self.whitelist_file or ""
+            "whitelist": self.whitelist_file or "",
+            "archive": self.archive_file or ""
         }
         with open(self.config_file, "w") as f:
             self.config.write(f)
@@ -96,6 +491,15 @@ class InstagramUnfollowApp:
         menubar = tk.Menu(self.root)
         self.root.config(menu=menubar)
         
+        history_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="History", menu=history_menu)
+        history_menu.add_command(label="Snapshot History...", command=self.show_history)
+        history_menu.add_command(label="Follow Dates...", command=self.show_follow_dates)
+        
+        accounts_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Accounts", menu=accounts_menu)
+        accounts_menu.add_command(label="Audience Overlap...", command=self.show_overlap)
+        
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="About", command=self.show_about)
@@ -112,13 +516,37 @@ class InstagramUnfollowApp:
         mode_frame = ttk.Frame(self.main_frame)
         mode_frame.pack(pady=5)
         
-        ttk.Radiobutton(mode_frame, text="Unfollowers", variable=self.mode, value="Unfollowers").pack(side=tk.LEFT, padx=5)
-        ttk.Radiobutton(mode_frame, text="Fans", variable=self.mode, value="Fans").pack(side=tk.LEFT, padx=5)
+        for view in RESULT_VIEWS:
+            ttk.Radiobutton(mode_frame, text=view, variable=self.mode, value=view, command=self.switch_mode).pack(side=tk.LEFT, padx=5)
+        
+        # Date Filter
+        date_frame = ttk.Frame(self.main_frame)
+        date_frame.pack(pady=5)
+        
+        self.date_relationship_combo = ttk.Combobox(date_frame, textvariable=self.date_relationship, values=list(DATE_RELATIONSHIPS), state="readonly", width=18)
+        self.date_relationship_combo.pack(side=tk.LEFT, padx=5)
+        self.date_relationship_combo.bind("<<ComboboxSelected>>", self.switch_mode)
+        Tooltip(self.date_relationship_combo, "Filter by when they followed you or you followed them (JSON exports only)")
+        
+        self.date_range_combo = ttk.Combobox(date_frame, textvariable=self.date_range, values=list(DATE_RANGES), state="readonly", width=22)
+        self.date_range_combo.pack(side=tk.LEFT, padx=5)
+        self.date_range_combo.bind("<<ComboboxSelected>>", self.switch_mode)
         
         # File Selection Frame
         file_frame = ttk.LabelFrame(self.main_frame, text="Select Files", padding=10)
         file_frame.pack(fill=tk.X, pady=10)
         
+        # Archive
+        archive_btn_frame = ttk.Frame(file_frame)
+        archive_btn_frame.pack(fill=tk.X, pady=5)
+        
+        self.btn_archive = ttk.Button(archive_btn_frame, text="Select Export Archive", command=self.select_archive)
+        self.btn_archive.pack(side=tk.LEFT)
+        Tooltip(self.btn_archive, "Select the Instagram data export ZIP (no need to extract it)")
+        
+        self.archive_label = ttk.Label(archive_btn_frame, text=self.archive_file.split("/")[-1] if self.archive_file else "No file selected", padding=(10, 0))
+        self.archive_label.pack(side=tk.LEFT)
+        
         # Followers
         followers_btn_frame = ttk.Frame(file_frame)
         followers_btn_frame.pack(fill=tk.X, pady=5)
@@ -155,10 +583,10 @@ class InstagramUnfollowApp:
         # Compare Button
         self.btn_compare = ttk.Button(self.main_frame, text="Compare", command=self.compare_threaded)
         self.btn_compare.pack(pady=10)
-        Tooltip(self.btn_compare, "Compare files and find unfollowers or fans")
+        Tooltip(self.btn_compare, "Compare files and find unfollowers, fans and mutuals")
         
         # Progress Bar
-        self.progress = ttk.Progressbar(self.main_frame, mode="indeterminate")
+        self.progress = ttk.Progressbar(self.main_frame, mode="determinate")
         self.progress.pack(pady=5, fill=tk.X)
         self.progress.pack_forget()  # Hide initially
         
@@ -186,23 +614,16 @@ class InstagramUnfollowApp:
         self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
-        self.regex_check = ttk.Checkbutton(search_frame, text="Regex", variable=self.use_regex)
+        self.regex_check = ttk.Checkbutton(search_frame, text="Regex", variable=self.use_regex, command=self.search_users)
         self.regex_check.pack(side=tk.LEFT, padx=5)
         Tooltip(self.regex_check, "Use regular expression for search")
         
         # Count Label (integrated in stats)
         
-        # Listbox with Scrollbar
-        list_frame = ttk.Frame(self.main_frame)
-        list_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        self.listbox_scroll = ttk.Scrollbar(list_frame)
-        self.listbox_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.listbox = tk.Listbox(list_frame, font=("Consolas", 12), yscrollcommand=self.listbox_scroll.set, selectmode=tk.EXTENDED)
-        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.listbox_scroll.config(command=self.listbox.yview)
-        self.listbox.bind("<Double-Button-1>", self.open_profile)
+        # Result list (only visible rows are rendered)
+        self.result_list = VirtualList(self.main_frame, font=("Consolas", 12))
+        self.result_list.pack(fill=tk.BOTH, expand=True, pady=10)
+        self.result_list.listbox.bind("<Double-Button-1>", self.open_profile)
         
         # Actions
         actions_frame = ttk.Frame(self.main_frame)
@@ -234,7 +655,7 @@ class InstagramUnfollowApp:
         
         self.root.configure(bg=self.theme["bg"])
         
-        self.listbox.configure(bg=self.theme["list_bg"], fg=self.theme["list_fg"],
+        self.result_list.listbox.configure(bg=self.theme["list_bg"], fg=self.theme["list_fg"],
                                selectbackground=self.theme["accent"], selectforeground=self.theme["btn_fg"])
         
         self.status_bar.configure(background=self.theme["btn_bg"], foreground=self.theme["status"])
@@ -246,6 +667,18 @@ class InstagramUnfollowApp:
         self.root.bind("<Control-c>", lambda e: self.copy_username())
         self.root.bind("<Control-e>", lambda e: self.export_results())
         
+    def show_history(self):
+        HistoryWindow(self.root, self.history, self.history_account(), self.theme)
+        
+    def show_overlap(self):
+        OverlapWindow(self.root, self.cache, self.theme)
+        
+    def show_follow_dates(self):
+        if not len(self.results.table):
+            messagebox.showwarning("No Results", "No results to chart. Please compare files first.")
+            return
+        FollowDatesWindow(self.root, self.results, self.mode.get(), self.theme)
+        
     def show_about(self):
         messagebox.showinfo("About", "Instagram Unfollow Tool\nVersion 1.1\n\nA professional tool to find users you follow who don't follow you back, or vice versa.\nSupports HTML and JSON from Instagram data export.\n\nCreated with Tkinter.")
         
@@ -254,6 +687,7 @@ class InstagramUnfollowApp:
         self.followers_file = filedialog.askopenfilename(title="Select Followers File", initialdir=initialdir, filetypes=[("HTML/JSON files", "*.html *.json")])
         if self.followers_file:
             self.followers_label.config(text=self.followers_file.split("/")[-1])
+            self.clear_archive()
             self.status_bar.config(text="Followers file selected")
             self.save_config()
             
@@ -262,126 +696,258 @@ class InstagramUnfollowApp:
         self.following_file = filedialog.askopenfilename(title="Select Following File", initialdir=initialdir, filetypes=[("HTML/JSON files", "*.html *.json")])
         if self.following_file:
             self.following_label.config(text=self.following_file.split("/")[-1])
+            self.clear_archive()
             self.status_bar.config(text="Following file selected")
             self.save_config()
             
+    def select_archive(self):
+        initialdir = os.path.dirname(self.archive_file) if self.archive_file else "."
+        self.archive_file = filedialog.askopenfilename(title="Select Export Archive", initialdir=initialdir, filetypes=[("ZIP archives", "*.zip")])
+        if self.archive_file:
+            self.archive_label.config(text=self.archive_file.split("/")[-1])
+            self.status_bar.config(text="Export archive selected")
+            self.save_config()
+            
+    def clear_archive(self):
+        self.archive_file = None
+        self.archive_label.config(text="No file selected")
+            
     def select_whitelist(self):
         initialdir = os.path.dirname(self.whitelist_file) if self.whitelist_file else "."
         self.whitelist_file = filedialog.askopenfilename(title="Select Whitelist TXT", initialdir=initialdir, filetypes=[("TXT files", "*.txt")])
         if self.whitelist_file:
             self.whitelist_label.config(text=self.whitelist_file.split("/")[-1])
             self.status_bar.config(text="Whitelist file selected")
-            self.load_whitelist()
+            if self.load_whitelist():
+                self.reapply_whitelist()
             self.save_config()
             
     def load_whitelist(self):
         if self.whitelist_file:
             try:
-                with open(self.whitelist_file, "r", encoding="utf-8") as f:
-                    self.whitelist = {line.strip() for line in f if line.strip()}
-                self.status_bar.config(text=f"Loaded {len(self.whitelist)} whitelist users")
+                self.whitelist_mtime = os.stat(self.whitelist_file).st_mtime_ns
+                self.whitelist = load_whitelist(self.whitelist_file)
+                self.status_bar.config(text=f"Loaded {len(self.whitelist)} whitelist rules")
+                return True
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load whitelist: {str(e)}")
-                self.whitelist = set()
+        return False
         
-    def extract_usernames(self, path, is_followers=True):
-        try:
-            if path.endswith(".json"):
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if isinstance(data, list):
-                    usernames = {item["string_list_data"][0]["value"] for item in data if "string_list_data" in item and item["string_list_data"]}
-                elif "relationships_following" in data:
-                    usernames = {item["string_list_data"][0]["value"] for item in data["relationships_following"] if "string_list_data" in item and item["string_list_data"]}
-                elif "relationships_followers" in data:
-                    usernames = {item["string_list_data"][0]["value"] for item in data["relationships_followers"] if "string_list_data" in item and item["string_list_data"]}
-                else:
-                    raise ValueError("Unknown JSON structure")
-            else:  # HTML
-                with open(path, "r", encoding="utf-8") as f:
-                    html = f.read()
-                usernames = set(re.findall(r'href="https://www.instagram.com/(?:_u/)?([^"/]+)"', html))
-            return usernames
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to read file {path}: {str(e)}")
-            return set()
+    def watch_whitelist(self):
+        # Poll the whitelist's mtime so edits apply without re-parsing the exports
+        if self.whitelist_file:
+            try:
+                mtime = os.stat(self.whitelist_file).st_mtime_ns
+            except OSError:
+                mtime = self.whitelist_mtime
+            if mtime != self.whitelist_mtime and self.load_whitelist():
+                self.reapply_whitelist()
+        self.root.after(WHITELIST_POLL_MS, self.watch_whitelist)
+        
+    def reapply_whitelist(self):
+        if not len(self.results.table):
+            return
+        self.whitelist_generation += 1
+        generation, base, whitelist = self.whitelist_generation, self.results, self.whitelist
+        def worker():
+            self.post_event({"job": "whitelist", "kind": "done", "generation": generation, "base": base,
+                             "results": base.with_whitelist(whitelist)})
+        threading.Thread(target=worker, daemon=True).start()
         
     def compare_threaded(self):
-        if not self.followers_file or not self.following_file:
-            messagebox.showwarning("Missing Files", "Please select both Followers and Following files.")
+        if self.btn_compare.instate(["disabled"]):
+            return  # a comparison is already running (Ctrl+R bypasses the disabled button)
+        if not self.archive_file and (not self.followers_file or not self.following_file):
+            messagebox.showwarning("Missing Files", "Please select an export archive or both Followers and Following files.")
             return
         
         self.status_bar.config(text="Comparing...")
-        self.progress.pack()
-        self.progress.start()
+        self.cache.hits = 0
+        self.cache.misses = 0
+        inputs = [self.archive_file] if self.archive_file else [self.followers_file, self.following_file]
+        total_bytes = sum(os.path.getsize(path) for path in inputs if os.path.exists(path))
+        self.progress.config(maximum=max(total_bytes, 1), value=0)
+        self.progress.pack(pady=5, fill=tk.X)
+        self.btn_compare.state(["disabled"])
+        
+        sinks = [self.post_event]
+        trace = None
+        if self.trace_file:
+            try:
+                trace = JSONLinesTrace(self.trace_file)
+                sinks.append(trace)
+            except OSError:
+                self.status_bar.config(text=f"Comparing... (could not open trace file {self.trace_file})")
+        channel = EventChannel(*sinks, total_bytes=total_bytes, job="compare")
         
-        thread = threading.Thread(target=self.compare_worker)
+        thread = threading.Thread(target=self.compare_worker, args=(channel, trace), daemon=True)
         thread.start()
-        self.root.after(100, self.check_queue)
         
-    def compare_worker(self):
-        self.followers = self.extract_usernames(self.followers_file, is_followers=True)
-        self.following = self.extract_usernames(self.following_file, is_followers=False)
+    def compare_worker(self, channel, trace=None):
+        # The worker owns the trace: it is closed only after the last event reached it
+        try:
+            self.run_compare(channel)
+        finally:
+            if trace:
+                trace.close()
         
-        if self.mode.get() == "Unfollowers":
-            diff = self.following - self.followers
-        else:
-            diff = self.followers - self.following
+    def run_compare(self, channel):
+        try:
+            if self.archive_file:
+                with channel.stage("parse archive"):
+                    followers, following = extract_archive(self.archive_file, self.cache, progress=channel)
+            else:
+                with channel.stage("parse followers"):
+                    followers = extract_usernames(self.followers_file, self.cache, progress=channel)
+                with channel.stage("parse following"):
+                    following = extract_usernames(self.following_file, self.cache, progress=channel)
+            with channel.stage("record history"):
+                self.record_history(followers, following)
+            with channel.stage("compare"):
+                results = RelationshipResults(followers, following, self.whitelist)
+            with channel.stage("index dates"):
+                results.time_index("followers")
+                results.time_index("following")
+        except Exception as e:
+            channel.emit("error", stage=channel.stage_name, message=str(e))
+            return
         
-        diff -= self.whitelist
+        self.results = results
+        self.followers, self.following = results.followers, results.following
+        channel.emit("done", results=len(results.view(self.mode.get())))
         
-        self.all_results = sorted(diff)
+    def post_event(self, event):
+        # Runs on the worker thread; Tk marshals the virtual event to the main loop
+        self.queue.put(event)
+        try:
+            self.root.event_generate("<<WorkerEvent>>", when="tail")
+        except (tk.TclError, RuntimeError):
+            pass  # window already closed
         
-        self.queue.put("done")
+    def history_account(self):
+        # One series per export source, so another account's files never read as churn
+        source = self.archive_file or self.followers_file
+        return os.path.abspath(source) if source else HISTORY_ACCOUNT
         
-    def check_queue(self):
+    def record_history(self, followers, following):
+        # An empty set means nothing was parsed; recording it would mark everyone as lost
         try:
-            msg = self.queue.get_nowait()
-            if msg == "done":
+            if followers:
+                self.history.record(self.history_account(), "followers", followers)
+            if following:
+                self.history.record(self.history_account(), "following", following)
+        except sqlite3.Error:
+            pass
+        
+    def on_worker_event(self, *args):
+        while True:
+            try:
+                event = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            kind = event["kind"]
+            if event.get("job") == "export":
+                self.on_export_event(event)
+            elif event.get("job") == "whitelist":
+                if event["generation"] != self.whitelist_generation:
+                    pass  # a newer reload is already running
+                elif event["base"] is not self.results:
+                    self.reapply_whitelist()  # a comparison replaced the results meanwhile
+                else:
+                    self.results = event["results"]
+                    self.all_results = self.current_view()
+                    self.searcher.reset()
+                    self.searcher.prepare(self.all_results)
+                    self.update_stats()
+                    self.search_users()
+                    self.status_bar.config(text=f"Whitelist reloaded — {len(self.results.whitelisted)} user(s) hidden")
+            elif kind == "stage":
+                self.status_bar.config(text=f"Comparing — {event['stage']}...")
+            elif kind == "progress":
+                self.progress.config(value=event["bytes_read"])
+                self.status_bar.config(text=f"Comparing — {event['stage']}: {event['records']:,} records, "
+                                            f"{event['bytes_read'] / 1e6:.1f} of {event['total_bytes'] / 1e6:.1f} MB")
+            elif kind == "error":
+                self.finish_compare()
+                self.status_bar.config(text="Comparison failed")
+                messagebox.showerror("Error", f"Comparison failed while trying to {event['stage']}: {event['message']}")
+            elif kind == "done":
+                self.finish_compare()
+                self.all_results = self.current_view()
+                self.searcher.reset()
+                self.searcher.prepare(self.all_results)
                 self.update_stats()
                 self.update_list(self.all_results)
                 self.auto_save()
-                self.status_bar.config(text=f"Comparison complete — {len(self.all_results)} results found")
-                self.progress.stop()
-                self.progress.pack_forget()
-        except queue.Empty:
-            self.root.after(100, self.check_queue)
+                if self.results.whitelist is not self.whitelist:
+                    self.reapply_whitelist()  # the whitelist was reloaded while comparing
+                self.status_bar.config(text=f"Comparison complete — {len(self.all_results)} results found (cache: {self.cache.hits} hit, {self.cache.misses} miss)")
+        
+    def finish_compare(self):
+        self.progress.pack_forget()
+        self.btn_compare.state(["!disabled"])
         
     def update_stats(self):
-        mutuals = len(self.followers & self.following)
+        mutuals = len(self.results.mutuals)
         self.stats_labels["followers"].config(text=f"Followers: {len(self.followers)}")
         self.stats_labels["following"].config(text=f"Following: {len(self.following)}")
         self.stats_labels["mutuals"].config(text=f"Mutuals: {mutuals}")
         self.stats_labels["results"].config(text=f"{self.mode.get()}: {len(self.all_results)}")
         
+    def current_view(self):
+        relationship = DATE_RELATIONSHIPS[self.date_relationship.get()]
+        if relationship is None:
+            return self.results.view(self.mode.get())
+        newer, older = DATE_RANGES[self.date_range.get()]
+        now = time.time()
+        return self.results.filter_by_date(self.mode.get(), relationship,
+                                           start=now - newer * 86400 if newer else None,
+                                           end=now - older * 86400 if older else None)
+        
+    def switch_mode(self, *args):
+        self.all_results = self.current_view()
+        self.update_stats()
+        self.search_users()
+        
     def update_list(self, data):
-        self.listbox.delete(0, tk.END)
-        for u in data:
-            self.listbox.insert(tk.END, u)
+        self.result_list.set_data(data)
         
     def search_users(self, *args):
         query = self.search_var.get().lower()
         if not query:
-            filtered = self.all_results
-        else:
-            if self.use_regex.get():
-                try:
-                    pattern = re.compile(query)
-                    filtered = [u for u in self.all_results if pattern.search(u.lower())]
-                except re.error:
-                    filtered = []
+            self.searcher.cancel()
+            self.search_generation = None
+            self.update_list(self.all_results)
+            self.status_bar.config(text=f"Search complete — {len(self.all_results)} result(s)")
+            return
+        self.search_generation = self.searcher.submit(self.all_results, query, self.use_regex.get())
+        if not self.search_polling:
+            self.search_polling = True
+            self.root.after(10, self.check_search)
+            
+    def check_search(self):
+        try:
+            while True:
+                generation, filtered = self.search_queue.get_nowait()
+                if generation != self.search_generation:
+                    continue
+                self.search_generation = None
+                if filtered is None:
                     self.status_bar.config(text="Invalid regex")
-                    return
-            else:
-                filtered = [u for u in self.all_results if query in u.lower()]
-        self.update_list(filtered)
-        self.status_bar.config(text=f"Search complete — {len(filtered)} result(s)")
+                else:
+                    self.update_list(filtered)
+                    self.status_bar.config(text=f"Search complete — {len(filtered)} result(s)")
+        except queue.Empty:
+            pass
+        if self.search_generation is None:
+            self.search_polling = False
+        else:
+            self.root.after(10, self.check_search)
         
     def copy_username(self):
         try:
-            selected = self.listbox.curselection()
-            if selected:
-                usernames = [self.listbox.get(idx) for idx in selected]
+            usernames = self.result_list.selected_items()
+            if usernames:
                 text = "\n".join(usernames)
                 self.root.clipboard_clear()
                 self.root.clipboard_append(text)
@@ -393,44 +959,45 @@ class InstagramUnfollowApp:
             
     def open_profile(self, event):
         try:
-            selected = self.listbox.curselection()
+            selected = self.result_list.selected_items()
             if selected:
-                username = self.listbox.get(selected[0])  # Open first selected
+                username = selected[0]  # Open first selected
                 webbrowser.open(f"https://www.instagram.com/{username}/")
         except:
             pass
         
     def export_results(self):
         if not self.all_results:
-            messagebox.showwarning("No Results", "No results to export. Please compare files first.")
+            message = "No results match the current date filter." if len(self.results.table) else "No results to export. Please compare files first."
+            messagebox.showwarning("No Results", message)
             return
         
-        filetypes = [("Text files", "*.txt"), ("CSV files", "*.csv")]
+        filetypes = [("Text files", "*.txt"), ("CSV files", "*.csv"), ("Gzipped text", "*.txt.gz"),
+                     ("Gzipped CSV", "*.csv.gz"), ("Columnar with metadata", "*.igcol")]
         file_path = filedialog.asksaveasfilename(title="Save Results", defaultextension=".txt", filetypes=filetypes)
         if file_path:
-            try:
-                if file_path.endswith(".csv"):
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        f.write("Username\n")
-                        for u in self.all_results:
-                            f.write(f"{u}\n")
-                else:
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        for u in self.all_results:
-                            f.write(u + "\n")
-                self.status_bar.config(text=f"Exported to {file_path.split('/')[-1]}")
-            except Exception as e:
-                messagebox.showerror("Export Error", f"Failed to export: {str(e)}")
+            # Only a date-filtered view needs its own rows; the full view can reuse the auto-save
+            view = self.results.view(self.mode.get())
+            rows = None if self.all_results is view else self.all_results
+            self.exporter.submit(self.results, self.mode.get(), [file_path], rows)
+            self.status_bar.config(text=f"Exporting to {file_path.split('/')[-1]}...")
     
     def auto_save(self):
-        if self.all_results:
-            mode_lower = self.mode.get().lower()
-            today = datetime.date.today().isoformat()
-            file_name = f"{mode_lower}_{today}.txt"
-            with open(file_name, "w", encoding="utf-8") as f:
-                for u in self.all_results:
-                    f.write(u + "\n")
-            self.status_bar.config(text=f"Auto-saved to {file_name}")
+        # The auto-save always holds the whole view, whatever date filter is showing
+        if len(self.results.view(self.mode.get())):
+            self.auto_save_file = auto_save_name(self.mode.get())
+            self.exporter.submit(self.results, self.mode.get(), [self.auto_save_file])
+            
+    def on_export_event(self, event):
+        user_paths = [path for path in event["paths"] if path != self.auto_save_file]
+        if event["kind"] == "error":
+            messagebox.showerror("Export Error", f"Failed to export: {event['message']}")
+        elif not user_paths:
+            return  # auto-save runs quietly behind the comparison status
+        elif event["kind"] == "progress":
+            self.status_bar.config(text=f"Exporting — {event['records']:,} rows written")
+        elif event["kind"] == "done":
+            self.status_bar.config(text=f"Exported to {', '.join(path.split('/')[-1] for path in user_paths)}")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,242 @@
+"""Benchmarks for the Instagram Unfollow Tool, with synthetic exports.
+
+    python ig_bench.py --sizes 1000,100000,1000000 --output bench.json
+    python ig_bench.py --sizes 100000 --tk --baseline bench.json
+
+Each size gets a generated account: HTML, the three JSON layouts and a
+multi-part export ZIP. Every stage (parsing, comparison, search, export
+and, with --tk, list population and search on the UI thread) is timed and
+its peak traced memory recorded; parsing stages take their memory figure
+from a serial run, since tracemalloc cannot see pool workers. Results are
+written as JSON so two runs can be compared with --baseline.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from ig_engine import (
+    RESULT_VIEWS, RelationshipResults, SearchIndex, TimeIndex,
+    extract_archive, extract_usernames, write_exports, write_results,
+)
+
+WORDS = ("sun", "moon", "pixel", "travel", "coffee", "studio", "daily", "the", "real", "art",
+         "photo", "fit", "chef", "music", "urban", "wild", "blue", "happy", "nomad", "design")
+SEPARATORS = ("", "_", ".", "__")
+JSON_LAYOUTS = ("list", "relationships_following", "relationships_followers")
+SEARCH_QUERIES = ("a", "su", "pix", "coffee_", "zz9")
+
+# -------- GENERATOR --------
+def base36(n):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+        if not n:
+            return out
+
+def synthetic_username(i, rng):
+    # The base36 index keeps every name unique however many are drawn
+    return rng.choice(WORDS) + rng.choice(SEPARATORS) + rng.choice(WORDS) + base36(i)
+
+def synthetic_account(size, seed=0):
+    """Return (followers, following) lists; following is 80% of size with 60% overlap."""
+    rng = random.Random(seed)
+    names = [synthetic_username(i, rng) for i in range(size * 6 // 5)]
+    return names[:size], names[size * 2 // 5:]
+
+def json_entry(name, timestamp):
+    return {"title": "", "media_list_data": [], "string_list_data": [
+        {"href": f"https://www.instagram.com/{name}", "value": name, "timestamp": timestamp}]}
+
+def write_json(f, names, layout, start=1500000000):
+    if layout != "list":
+        f.write(f'{{"{layout}": ')
+    f.write("[")
+    for i, name in enumerate(names):
+        f.write((",\n" if i else "\n") + json.dumps(json_entry(name, start + i * 60)))
+    f.write("\n]")
+    if layout != "list":
+        f.write("}")
+
+def write_html(f, names):
+    f.write("<html><head><title>Followers</title></head><body><main>\n")
+    for i, name in enumerate(names):
+        f.write(f'<div class="pam"><div><div><a target="_blank" href="https://www.instagram.com/{name}">{name}</a>'
+                f'</div><div>Jan {i % 28 + 1:02d}, 2024 10:00 am</div></div></div>\n')
+    f.write("</main></body></html>\n")
+
+def write_zip(path, followers, following, parts=1):
+    base = "connections/followers_and_following/"
+    step = -(-len(followers) // parts) or 1
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for part in range(parts):
+            with zf.open(f"{base}followers_{part + 1}.json", "w") as raw, open_text(raw) as f:
+                write_json(f, followers[part * step:(part + 1) * step], "list")
+        with zf.open(f"{base}following.json", "w") as raw, open_text(raw) as f:
+            write_json(f, following, "relationships_following")
+
+def open_text(raw):
+    return io.TextIOWrapper(raw, encoding="utf-8")
+
+def generate(directory, size, parts=None, seed=0):
+    """Write a full synthetic export set for one account size into directory."""
+    followers, following = synthetic_account(size, seed)
+    files = {}
+    for layout in JSON_LAYOUTS:
+        names = following if layout == "relationships_following" else followers
+        files[f"json_{layout}"] = os.path.join(directory, f"{layout}.json")
+        with open(files[f"json_{layout}"], "w", encoding="utf-8") as f:
+            write_json(f, names, layout)
+    files["html"] = os.path.join(directory, "followers.html")
+    with open(files["html"], "w", encoding="utf-8") as f:
+        write_html(f, followers)
+    files["zip"] = os.path.join(directory, "export.zip")
+    write_zip(files["zip"], followers, following, parts or max(1, size // 100000))
+    return followers, following, files
+
+# -------- HARNESS --------
+def measure(fn, trace_memory=True, memory_fn=None):
+    """Run fn once for time and, if asked, once more under tracemalloc for peak memory.
+
+    tracemalloc only sees this process, so stages that parse in a process
+    pool pass memory_fn, a serial equivalent, for the memory pass.
+    """
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        (memory_fn or fn)()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+class Recorder:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.rows = []
+
+    def stage(self, size, name, fn, memory_fn=None, **extra):
+        result, seconds, peak = measure(fn, self.trace_memory, memory_fn)
+        self.rows.append(dict(size=size, stage=name, seconds=round(seconds, 6), peak_bytes=peak, **extra))
+        memory = f"  peak {peak / 1e6:.1f} MB" if peak is not None else ""
+        print(f"{size:>10}  {name:<32} {seconds * 1000:10.1f} ms{memory}")
+        return result
+
+def bench_engine(recorder, size, files, workdir):
+    for key in ("json_list", "json_relationships_following", "json_relationships_followers", "html"):
+        recorder.stage(size, f"extract_{key}", lambda: extract_usernames(files[key]),
+                       memory_fn=lambda: extract_usernames(files[key], max_workers=1))
+    followers, following = recorder.stage(size, "extract_archive", lambda: extract_archive(files["zip"]),
+                                          memory_fn=lambda: extract_archive(files["zip"], max_workers=1))
+    results = recorder.stage(size, "compare", lambda: RelationshipResults(followers, following))
+    index = recorder.stage(size, "search_index", lambda: SearchIndex(results.unfollowers))
+    for query in SEARCH_QUERIES:
+        recorder.stage(size, f"search[{query}]", lambda: index.search(query))
+    dates = recorder.stage(size, "time_index", lambda: TimeIndex(results.following.ids, results.following_meta))
+    middle = dates.times[len(dates) // 2] if len(dates) else 0
+    recorder.stage(size, "date_filter", lambda: dates.between(None, middle))
+    for view in RESULT_VIEWS:
+        path = os.path.join(workdir, f"{view.lower()}.txt")
+        recorder.stage(size, f"export_{view.lower()}", lambda: write_results(path, results.view(view)), rows=len(results.view(view)))
+    for fmt in ("csv.gz", "igcol"):
+        path = os.path.join(workdir, f"fans.{fmt}")
+        recorder.stage(size, f"export_fans.{fmt}", lambda: write_exports(results, "Fans", [path]), rows=len(results.fans))
+    return results
+
+def bench_tk(recorder, size, results, workdir):
+    # Imported lazily: the engine benchmarks must run without Tk
+    import tkinter as tk
+    from ig import InstagramUnfollowApp
+
+    cwd = os.getcwd()
+    os.chdir(workdir)  # the app keeps config.ini, cache and history next to cwd
+    root = tk.Tk()
+    root.withdraw()
+    try:
+        app = InstagramUnfollowApp(root)
+        app.results = results
+        app.all_results = results.view("Unfollowers")
+        root.update()
+
+        def populate():
+            app.update_list(app.all_results)
+            root.update_idletasks()
+        recorder.stage(size, "tk_update_list", populate)
+
+        def search(query):
+            app.search_var.set(query)
+            while app.search_generation is not None:
+                root.update()
+                time.sleep(0.001)
+        app.searcher.index(app.all_results)  # index build is measured separately
+        for query in SEARCH_QUERIES:
+            recorder.stage(size, f"tk_search[{query}]", lambda: search(query))
+        recorder.stage(size, "tk_switch_mode", lambda: (app.mode.set("Fans"), app.switch_mode(), root.update_idletasks()))
+    finally:
+        root.destroy()
+        os.chdir(cwd)
+
+def compare_runs(rows, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    print(f"\n{'size':>10}  {'stage':<32} {'baseline':>10} {'now':>10} {'speedup':>8}")
+    for row in rows:
+        old = baseline.get((row["size"], row["stage"]))
+        if old and row["seconds"]:
+            print(f"{row['size']:>10}  {row['stage']:<32} {old['seconds'] * 1000:8.1f}ms {row['seconds'] * 1000:8.1f}ms {old['seconds'] / row['seconds']:7.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsing, comparison, search and export on synthetic exports.")
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated follower counts (default: 1000,100000)")
+    parser.add_argument("--parts", type=int, default=None, help="followers_N.json parts per ZIP (default: one per 100k)")
+    parser.add_argument("--output", default="bench.json", help="where to write the JSON results (default: bench.json)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--tk", action="store_true", help="also time list population and search on a hidden Tk window")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass (halves the run time)")
+    parser.add_argument("--keep", metavar="DIR", help="generate exports into DIR and keep them")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    recorder = Recorder(trace_memory=not args.no_memory)
+    for size in (int(s) for s in args.sizes.split(",")):
+        workdir = os.path.join(args.keep, str(size)) if args.keep else tempfile.mkdtemp(prefix="ig_bench_")
+        os.makedirs(workdir, exist_ok=True)
+        try:
+            started = time.perf_counter()
+            _, _, files = generate(workdir, size, args.parts, args.seed)
+            print(f"{size:>10}  generated exports in {time.perf_counter() - started:.1f}s")
+            results = bench_engine(recorder, size, files, workdir)
+            if args.tk:
+                bench_tk(recorder, size, results, workdir)
+        finally:
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": recorder.rows,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(recorder.rows)} measurements to {args.output}")
+    if args.baseline:
+        compare_runs(recorder.rows, args.baseline)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Headless batch runner for the Instagram Unfollow Tool.
+
+    python ig.py --headless exports/ --output results/
+    python ig_cli.py --pair followers_1.json following.json --pair ...
+
+Every input is an export ZIP, a directory holding one account's export
+files, or a directory of such archives/directories. Accounts are processed
+in a process pool; each gets its own result files and a summary.json
+describes the whole run. With --overlap (or --query) the accounts' follower
+audiences are compared with each other instead, and with --watch the inputs
+are polled and accounts re-processed whenever their exports change. Nothing
+here imports tkinter.
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ig_engine import (
+    EXPORT_FORMATS, EXPORT_MEMBER_RE, RESULT_VIEWS, WATCH_DEBOUNCE, WATCH_INTERVAL, AudienceMatrix, EventChannel,
+    FolderWatcher, JSONLinesTrace, ParseCache, ParsedUsernames, RelationshipResults, SnapshotStore,
+    extract_archive, extract_followers, extract_usernames, is_export_file, load_whitelist, write_exports, write_results,
+)
+
+def find_export_files(directory):
+    files = {"followers": [], "following": []}
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            if is_export_file(name, depth=1):
+                files[EXPORT_MEMBER_RE.fullmatch(name).group(1)].append(os.path.join(dirpath, name))
+    return files
+
+def find_accounts(inputs):
+    # Follows the same is_export_file rule as FolderWatcher, so every watched change maps to an account
+    accounts = []
+    for path in inputs:
+        name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+        if os.path.isfile(path):
+            accounts.append({"name": name, "archive": path})
+            continue
+        try:
+            entries = sorted(os.scandir(path), key=lambda e: e.name)
+        except OSError as e:
+            print(f"Skipping {path}: {e.strerror or e}", file=sys.stderr)
+            continue
+        top = {"followers": [], "following": []}
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(".zip"):
+                accounts.append({"name": os.path.splitext(entry.name)[0], "archive": entry.path})
+            elif entry.is_file() and is_export_file(entry.name):
+                top[EXPORT_MEMBER_RE.fullmatch(entry.name).group(1)].append(entry.path)
+            elif entry.is_dir():
+                files = find_export_files(entry.path)
+                if files["followers"] and files["following"]:
+                    accounts.append(dict(files, name=entry.name))
+        if top["followers"] and top["following"]:
+            accounts.append(dict(top, name=name))
+    return accounts
+
+def unique_names(accounts):
+    seen = {}
+    for account in accounts:
+        base = account["name"]
+        seen[base] = seen.get(base, 0) + 1
+        if seen[base] > 1:
+            account["name"] = f"{base}_{seen[base]}"
+    return accounts
+
+def process_account(account, whitelist, output_dir, fmt, cache_dir=None, history_path=None, trace_path=None):
+    started = time.perf_counter()
+    summary = {"name": account["name"]}
+    trace = channel = None
+    try:
+        # Inside the try: a missing input or trace directory fails this account only
+        trace = JSONLinesTrace(trace_path) if trace_path else None
+        inputs = [account["archive"]] if "archive" in account else account["followers"] + account["following"]
+        channel = EventChannel(*([trace] if trace else []), total_bytes=sum(map(os.path.getsize, inputs)), account=account["name"])
+        cache = ParseCache(cache_dir) if cache_dir else None
+        # Accounts already run in parallel, so parse each one serially
+        with channel.stage("parse"):
+            if "archive" in account:
+                followers, following = extract_archive(account["archive"], cache, max_workers=1, progress=channel)
+            else:
+                followers, following = ParsedUsernames(), ParsedUsernames()
+                for path in account["followers"]:
+                    followers.merge(extract_usernames(path, cache, max_workers=1, progress=channel))
+                for path in account["following"]:
+                    following.merge(extract_usernames(path, cache, max_workers=1, progress=channel))
+        if history_path:
+            with channel.stage("record history"):
+                history = SnapshotStore(history_path)
+                for kind, usernames in (("followers", followers), ("following", following)):
+                    if usernames:
+                        history.record(account["name"], kind, usernames)
+        with channel.stage("compare"):
+            results = RelationshipResults(followers, following, whitelist)
+        with channel.stage("write results"):
+            account_dir = os.path.join(output_dir, account["name"])
+            os.makedirs(account_dir, exist_ok=True)
+            for view in RESULT_VIEWS:
+                write_exports(results, view, [os.path.join(account_dir, f"{view.lower()}.{fmt}")], channel)
+        summary.update(followers=len(followers), following=len(following),
+                       **{view.lower(): len(results.view(view)) for view in RESULT_VIEWS})
+        channel.emit("done")
+    except Exception as e:
+        summary["error"] = str(e)
+        if channel:
+            channel.emit("error", stage=channel.stage_name, message=str(e))
+    finally:
+        if trace:
+            trace.close()
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+def load_audience(account, cache_dir=None):
+    cache = ParseCache(cache_dir) if cache_dir else None
+    paths = [account["archive"]] if "archive" in account else account["followers"]
+    followers = set()
+    for path in paths:
+        followers |= extract_followers(path, cache, max_workers=1)
+    return followers
+
+def run_overlap(accounts, args):
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        audiences = list(pool.map(load_audience, accounts, [args.cache] * len(accounts)))
+    matrix = AudienceMatrix({account["name"]: audience for account, audience in zip(accounts, audiences)})
+    jaccard = matrix.jaccard()
+    with open(os.path.join(args.output, "overlap.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["account"] + matrix.labels)
+        for label, row in zip(matrix.labels, jaccard):
+            writer.writerow([label] + [f"{value:.4f}" for value in row])
+    queries = []
+    for number, expression in enumerate(args.query, 1):
+        try:
+            usernames = matrix.query(expression)
+        except ValueError as e:
+            print(f"{expression}: {e}", file=sys.stderr)
+            return 2
+        path = os.path.join(args.output, f"query_{number}.txt")
+        write_results(path, usernames)
+        queries.append({"query": expression, "matches": len(usernames), "file": os.path.basename(path)})
+    summary = {
+        "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - started, 3),
+        "accounts": [{"name": label, "followers": matrix.sizes[label]} for label in matrix.labels],
+        "audience": len(matrix.table),
+        "shared": matrix.overlaps(),
+        "jaccard": [[round(value, 6) for value in row] for row in jaccard],
+        "queries": queries,
+    }
+    with open(os.path.join(args.output, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Compared the audiences of {len(accounts)} account(s) in {summary['seconds']}s")
+    return 0
+
+def account_files(account):
+    return {account["archive"]} if "archive" in account else set(account["followers"] + account["following"])
+
+def write_summary(output_dir, summaries, seconds):
+    summary = {
+        "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(seconds, 3),
+        "accounts": summaries,
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def run_watch(args, whitelist):
+    # Unchanged files of a re-processed account come from the cache, so only new drops are parsed
+    cache_dir = args.cache or os.path.join(args.output, ".cache")
+    watcher = FolderWatcher(args.inputs, interval=args.interval, debounce=args.debounce)
+    summaries = {}
+    print(f"Watching {', '.join(args.inputs)} every {args.interval:g}s (Ctrl+C to stop)")
+    pool = ProcessPoolExecutor(max_workers=args.jobs)
+    try:
+        for batch in watcher.watch():
+            started = time.perf_counter()
+            changed = set(batch)
+            try:
+                accounts = [account for account in unique_names(find_accounts(args.inputs)) if account_files(account) & changed]
+                if not accounts:
+                    continue
+                n = len(accounts)
+                for summary in pool.map(process_account, accounts, [whitelist] * n, [args.output] * n, [args.format] * n,
+                                        [cache_dir] * n, [args.history] * n, [args.trace] * n):
+                    summaries[summary["name"]] = summary
+                    status = summary.get("error") or f"{summary['unfollowers']} unfollowers, {summary['fans']} fans"
+                    print(f"{datetime.datetime.now():%H:%M:%S}  {summary['name']}: {status}")
+                write_summary(args.output, [summaries[name] for name in sorted(summaries)], time.perf_counter() - started)
+            except Exception as e:
+                # One bad batch must not stop the daemon; the next change retries it
+                print(f"{datetime.datetime.now():%H:%M:%S}  batch failed: {e!r}", file=sys.stderr)
+                if isinstance(e, BrokenProcessPool):
+                    pool.shutdown(wait=False)
+                    pool = ProcessPoolExecutor(max_workers=args.jobs)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ig-analyze", description="Compare Instagram followers/following exports without the GUI.")
+    parser.add_argument("inputs", nargs="*", help="export ZIPs, account directories, or directories of them")
+    parser.add_argument("--pair", nargs=2, action="append", default=[], metavar=("FOLLOWERS", "FOLLOWING"), help="an explicit followers/following file pair (repeatable)")
+    parser.add_argument("--whitelist", help="TXT file of usernames, globs or re: regexes to exclude (one rule per line)")
+    parser.add_argument("--output", default="results", help="directory for per-account results and summary.json (default: results)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="txt", help="result file format; igcol is columnar with per-row metadata (default: txt)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--cache", metavar="DIR", help="reuse parsed exports from this cache directory")
+    parser.add_argument("--trace", metavar="FILE", help="append stage/progress events to FILE as JSON lines")
+    parser.add_argument("--history", metavar="DB", help="record each account's followers/following in this SQLite snapshot store")
+    parser.add_argument("--watch", action="store_true", help="keep running and re-process accounts whose exports change (directory inputs)")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help=f"seconds between folder scans with --watch (default: {WATCH_INTERVAL:g})")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE, help=f"seconds a folder must stay unchanged before a batch runs (default: {WATCH_DEBOUNCE:g})")
+    parser.add_argument("--overlap", action="store_true", help="compare follower audiences across accounts (overlap.csv) instead of each account's own lists")
+    parser.add_argument("--query", action="append", default=[], metavar="EXPR",
+                        help="audience query over account names, e.g. \"A & B - others(A, B)\" (repeatable; implies --overlap)")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        whitelist = load_whitelist(args.whitelist) if args.whitelist else None
+    except (OSError, ValueError) as e:
+        print(f"Failed to load whitelist: {e}", file=sys.stderr)
+        return 2
+    if args.watch:
+        if not args.inputs or args.pair:
+            print("--watch needs directory inputs and does not take --pair.", file=sys.stderr)
+            return 2
+        os.makedirs(args.output, exist_ok=True)
+        if args.history:
+            SnapshotStore(args.history)
+        return run_watch(args, whitelist)
+    accounts = find_accounts(args.inputs)
+    for followers, following in args.pair:
+        name = os.path.basename(os.path.dirname(os.path.abspath(followers))) or "account"
+        accounts.append({"name": name, "followers": [followers], "following": [following]})
+    if not accounts:
+        print("No exports found.", file=sys.stderr)
+        return 2
+    unique_names(accounts)
+    os.makedirs(args.output, exist_ok=True)
+    if args.overlap or args.query:
+        return run_overlap(accounts, args)
+    if args.history:
+        SnapshotStore(args.history)  # create the schema once, before workers race for it
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        summaries = list(pool.map(process_account, accounts, [whitelist] * len(accounts),
+                                  [args.output] * len(accounts), [args.format] * len(accounts),
+                                  [args.cache] * len(accounts), [args.history] * len(accounts),
+                                  [args.trace] * len(accounts)))
+    summary = write_summary(args.output, summaries, time.perf_counter() - started)
+
+    failed = [s for s in summaries if "error" in s]
+    for s in failed:
+        print(f"{s['name']}: {s['error']}", file=sys.stderr)
+    print(f"Processed {len(summaries) - len(failed)}/{len(summaries)} account(s) in {summary['seconds']}s")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
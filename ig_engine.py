@@ -0,0 +1,1425 @@
+"""GUI-free core of the Instagram Unfollow Tool.
+
+Parsing, caching, comparison, search and result writing live here so they
+can run headless (see ig_cli.py) without importing tkinter.
+"""
+import re
+import json
+import os
+import datetime
+import mmap
+import sys
+import time
+import codecs
+import zipfile
+import hashlib
+import zlib
+import functools
+import fnmatch
+import copy
+import bisect
+import gzip
+import shutil
+import struct
+import ast
+import operator
+import threading
+import queue
+import sqlite3
+from array import array
+from contextlib import ExitStack, closing, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# -------- PARSING --------
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_MAX_ENTRY_BYTES = 16 * 1024 * 1024  # no real follower entry comes near this
+JSON_PROGRESS_RECORDS = 4096
+JSON_LIST_KEYS = ("relationships_following", "relationships_followers")
+
+class JSONStream:
+    """Minimal pull tokenizer over a binary file, read in fixed-size chunks.
+
+    Only the structure Instagram exports use is walked token by token; each
+    list element is decoded on its own, so memory stays at one chunk plus
+    one entry no matter how large the export is.
+    """
+    def __init__(self, f, chunk_size=JSON_CHUNK_SIZE, progress=None, max_entry=JSON_MAX_ENTRY_BYTES):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.max_entry = max_entry
+        self.progress = progress
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        chunk = ""
+        while not chunk:
+            if self.eof:
+                return False
+            data = self.f.read(self.chunk_size)
+            if self.progress and data:
+                self.progress(len(data))
+            self.eof = not data
+            chunk = self.utf8.decode(data, final=self.eof)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"Expected one of {chars!r} but found {ch or 'end of file'!r}")
+        self.pos += 1
+        return ch
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Each refill re-parses the entry from its start, so an entry that
+                # never closes must not keep the whole file in memory
+                if len(self.buf) - self.pos > self.max_entry:
+                    raise ValueError(f"A single entry is larger than {self.max_entry:,} bytes; the file is not a valid export")
+                if not self.fill():
+                    raise
+                continue
+            # A scalar that ends exactly at the buffer edge may be cut short
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.expect(",]") == "]":
+                return
+
+def iter_json_entries(f, chunk_size=JSON_CHUNK_SIZE, progress=None):
+    """Yield (value, href, timestamp) for every entry of a followers/following JSON."""
+    stream = JSONStream(f, chunk_size, progress)
+    first = stream.peek()
+    if first == "[":
+        items = stream.iter_array()
+    elif first == "{":
+        stream.pos += 1
+        items = None
+        if stream.peek() != "}":
+            while True:
+                key = stream.decode()
+                stream.expect(":")
+                if key in JSON_LIST_KEYS:
+                    items = stream.iter_array()
+                    break
+                stream.decode()
+                if stream.expect(",}") == "}":
+                    break
+        if items is None:
+            raise ValueError("Unknown JSON structure")
+    else:
+        raise ValueError("Unknown JSON structure")
+    for item in items:
+        if isinstance(item, dict) and item.get("string_list_data"):
+            data = item["string_list_data"][0]
+            yield data["value"], data.get("href"), data.get("timestamp")
+
+def iter_json_usernames(f, chunk_size=JSON_CHUNK_SIZE, progress=None):
+    for value, _, _ in iter_json_entries(f, chunk_size, progress):
+        yield value
+
+PROFILE_URL = "https://www.instagram.com/"
+HREF_NONE, HREF_PLAIN, HREF_U, HREF_ODD = range(4)
+
+def href_code(value, href):
+    if not href:
+        return HREF_NONE
+    if href == PROFILE_URL + value:
+        return HREF_PLAIN
+    if href == PROFILE_URL + "_u/" + value:
+        return HREF_U
+    return HREF_ODD
+
+def href_from_code(value, code, odd_hrefs):
+    if code == HREF_PLAIN:
+        return PROFILE_URL + value
+    if code == HREF_U:
+        return PROFILE_URL + "_u/" + value
+    if code == HREF_ODD:
+        return odd_hrefs.get(value)
+    return None
+
+class ParsedUsernames(set):
+    """A parsed username set that also keeps the JSON entries' metadata.
+
+    meta maps username -> timestamp << 2 | href form (HREF_*), so the href
+    is rebuilt from the username; hrefs in neither standard form are kept
+    verbatim in odd_hrefs. HTML exports carry no metadata.
+    """
+    def __init__(self, usernames=()):
+        super().__init__(usernames)
+        self.meta = {}
+        self.odd_hrefs = {}
+
+    def add_entry(self, value, href=None, timestamp=None):
+        self.add(value)
+        code = href_code(value, href)
+        if code == HREF_ODD:
+            self.odd_hrefs[value] = href
+        self.meta[value] = (int(timestamp or 0) << 2) | code
+
+    def merge(self, other):
+        self.update(other)
+        self.meta.update(getattr(other, "meta", {}))
+        self.odd_hrefs.update(getattr(other, "odd_hrefs", {}))
+        return self
+
+def parse_json_usernames(f, progress=None):
+    usernames = ParsedUsernames()
+    reported = 0
+    for i, (value, href, timestamp) in enumerate(iter_json_entries(f, progress=progress), 1):
+        usernames.add_entry(value, href, timestamp)
+        if progress and i % JSON_PROGRESS_RECORDS == 0:
+            progress(0, len(usernames) - reported)
+            reported = len(usernames)
+    if progress:
+        progress(0, len(usernames) - reported)
+    return usernames
+
+HTML_USERNAME_RE = re.compile(rb'href="https://www.instagram.com/(?:_u/)?([^"/]+)"')
+HTML_PARALLEL_THRESHOLD = 32 * 1024 * 1024
+HTML_CHUNK_SIZE = 8 * 1024 * 1024
+
+def scan_html_usernames(buf, start=0, end=None):
+    if end is None:
+        end = len(buf)
+    return {m.decode("utf-8") for m in HTML_USERNAME_RE.findall(buf, start, end)}
+
+def html_chunk_bounds(buf, chunk_size=HTML_CHUNK_SIZE):
+    # Cut just after a quote that does not open an href value. Every match
+    # holds exactly two quotes (after href= and at the end), so no match can
+    # straddle such a cut and the chunks need no overlap or de-duplication.
+    bounds = [0]
+    target = chunk_size
+    while target < len(buf):
+        cut = buf.find(b'"', target)
+        while cut != -1 and buf[cut - 5:cut] == b"href=":
+            cut = buf.find(b'"', cut + 1)
+        if cut == -1:
+            break
+        bounds.append(cut + 1)
+        target = cut + 1 + chunk_size
+    bounds.append(len(buf))
+    return list(zip(bounds, bounds[1:]))
+
+def scan_html_file_range(path, start, end):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return scan_html_usernames(mm, start, end)
+
+def extract_html_usernames(path, threshold=HTML_PARALLEL_THRESHOLD, chunk_size=HTML_CHUNK_SIZE, max_workers=None, progress=None):
+    if os.path.getsize(path) == 0:
+        return set()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < threshold or max_workers == 1:
+            usernames = scan_html_usernames(mm)
+            if progress:
+                progress(len(mm), len(usernames))
+            return usernames
+        ranges = html_chunk_bounds(mm, chunk_size)
+    usernames = set()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for (start, end), part in zip(ranges, pool.map(scan_html_file_range, [path] * len(ranges), *zip(*ranges))):
+            usernames |= part
+            if progress:
+                progress(end - start, len(part))
+    return usernames
+
+EXPORT_MEMBER_RE = re.compile(r"(followers|following)(?:_\d+)?\.(?:json|html)")
+
+def find_export_members(zf):
+    members = {"followers": [], "following": []}
+    for info in zf.infolist():
+        if info.is_dir():
+            continue
+        m = EXPORT_MEMBER_RE.fullmatch(info.filename.rsplit("/", 1)[-1])
+        if m:
+            members[m.group(1)].append(info)
+    return members
+
+def parse_archive_member(archive_path, name):
+    with zipfile.ZipFile(archive_path) as zf:
+        if name.endswith(".json"):
+            with zf.open(name) as f:
+                return parse_json_usernames(f)
+        return scan_html_usernames(zf.read(name))
+
+def extract_archive_usernames(archive_path, max_workers=None, progress=None):
+    with zipfile.ZipFile(archive_path) as zf:
+        members = find_export_members(zf)
+    jobs = [(kind, info) for kind, infos in members.items() for info in infos]
+    if not jobs:
+        raise ValueError("No followers/following files found in archive")
+    result = {"followers": ParsedUsernames(), "following": ParsedUsernames()}
+
+    def merge(parsed):
+        for (kind, info), usernames in zip(jobs, parsed):
+            result[kind].merge(usernames)
+            if progress:
+                progress(info.compress_size, len(usernames))
+
+    names = [info.filename for _, info in jobs]
+    if max_workers == 1:
+        merge(map(parse_archive_member, [archive_path] * len(jobs), names))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            merge(pool.map(parse_archive_member, [archive_path] * len(jobs), names))
+    return result["followers"], result["following"]
+
+def extract_usernames(path, cache=None, max_workers=None, progress=None):
+    usernames = cache.get(path) if cache else None
+    if usernames is not None:
+        if progress:
+            progress(os.path.getsize(path), len(usernames))
+        return usernames
+    if path.endswith(".json"):
+        with open(path, "rb") as f:
+            usernames = parse_json_usernames(f, progress)
+    else:  # HTML
+        usernames = extract_html_usernames(path, max_workers=max_workers, progress=progress)
+    if cache:
+        cache.put(path, usernames)
+    return usernames
+
+def extract_archive(path, cache=None, max_workers=None, progress=None):
+    if cache:
+        followers = cache.get(path, tag="followers")
+        following = cache.get(path, tag="following")
+        if followers is not None and following is not None:
+            if progress:
+                progress(os.path.getsize(path), len(followers) + len(following))
+            return followers, following
+    followers, following = extract_archive_usernames(path, max_workers, progress)
+    if cache:
+        cache.put(path, followers, tag="followers")
+        cache.put(path, following, tag="following")
+    return followers, following
+
+WHITELIST_GLOB_CHARS = frozenset("*?[")
+LEADING_FLAGS_RE = re.compile(r"\(\?([aiLmsux]+)\)")
+# Numbered or named back-references and conditionals break once rules share one pattern
+GROUP_REFERENCE_RE = re.compile(r"\\[1-9]|\(\?P[=<]|\(\?\(")
+
+def scope_leading_flags(pattern):
+    """Turn leading global flags, "(?i)abc", into a scoped group, "(?i:abc)"."""
+    flags = ""
+    m = LEADING_FLAGS_RE.match(pattern)
+    while m:
+        flags += m.group(1)
+        pattern = pattern[m.end():]
+        m = LEADING_FLAGS_RE.match(pattern)
+    return f"(?{flags}:{pattern})" if flags else pattern
+TRIE_END = ""
+
+def trie_insert(trie, key):
+    node = trie
+    for ch in key:
+        node = node.setdefault(ch, {})
+    node[TRIE_END] = True
+
+def trie_has_prefix_of(trie, text):
+    node = trie
+    for ch in text:
+        if TRIE_END in node:
+            return True
+        node = node.get(ch)
+        if node is None:
+            return False
+    return TRIE_END in node
+
+class WhitelistMatcher:
+    """Whitelist rules compiled into one matcher.
+
+    A rule is an exact username, a glob ("brand*", "*_official", "shop_??")
+    or a regex prefixed with "re:" that must match the whole username; "#"
+    starts a comment. Exact names go into a hash set, "prefix*" and
+    "*suffix" globs into character tries, and every other rule into a single
+    alternation regex, so one username costs at most one lookup, two trie
+    walks and one regex match whatever the number of rules. The few regexes
+    that refer to their own groups are kept as separate patterns.
+    """
+    def __init__(self, rules=()):
+        self.exact = set()
+        self.prefixes = {}
+        self.suffixes = {}
+        self.count = 0
+        self.separate = []
+        patterns = []
+        for number, line in enumerate(rules, 1):
+            rule = line.strip()
+            if not rule or rule.startswith("#"):
+                continue
+            self.count += 1
+            if rule.startswith("re:"):
+                pattern = scope_leading_flags(rule[3:])
+                try:
+                    compiled = re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"line {number}: invalid regex {rule[3:]!r} ({e})") from None
+                if GROUP_REFERENCE_RE.search(pattern):
+                    self.separate.append(compiled)
+                else:
+                    patterns.append(pattern)
+            elif not WHITELIST_GLOB_CHARS.intersection(rule):
+                self.exact.add(rule)
+            elif rule.endswith("*") and not WHITELIST_GLOB_CHARS.intersection(rule[:-1]):
+                trie_insert(self.prefixes, rule[:-1])
+            elif rule.startswith("*") and not WHITELIST_GLOB_CHARS.intersection(rule[1:]):
+                trie_insert(self.suffixes, rule[:0:-1])
+            else:
+                patterns.append(fnmatch.translate(rule))
+        try:
+            self.pattern = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        except re.error as e:
+            raise ValueError(f"whitelist rules cannot be combined ({e})") from None
+
+    def __len__(self):
+        return self.count
+
+    def matches(self, name):
+        return (name in self.exact
+                or (self.prefixes and trie_has_prefix_of(self.prefixes, name))
+                or (self.suffixes and trie_has_prefix_of(self.suffixes, name[::-1]))
+                or (self.pattern is not None and self.pattern.fullmatch(name) is not None)
+                or any(pattern.fullmatch(name) for pattern in self.separate))
+
+    __contains__ = matches
+
+def extract_followers(path, cache=None, max_workers=None, progress=None):
+    """Followers of one account, from an export ZIP or a single followers file."""
+    if path.endswith(".zip"):
+        return extract_archive(path, cache, max_workers, progress)[0]
+    return extract_usernames(path, cache, max_workers, progress)
+
+def load_whitelist(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return WhitelistMatcher(f)
+
+# -------- EVENTS --------
+EVENT_PROGRESS_INTERVAL = 0.05
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None where unknown."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+class JSONLinesTrace:
+    """Event sink appending one JSON object per line, safe to share between threads."""
+    def __init__(self, path):
+        self.f = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event) + "\n"
+        with self.lock:
+            self.f.write(line)
+            self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+class EventChannel:
+    """Structured events from a worker, fanned out to sinks.
+
+    Events are dicts with a "kind" (stage, progress, stage_done, error,
+    done), a timestamp and any context given at construction. Progress is
+    counted in bytes read and records parsed and is throttled to one event
+    per EVENT_PROGRESS_INTERVAL; pass the channel itself as a parser's
+    progress callback.
+    """
+    def __init__(self, *sinks, total_bytes=0, **context):
+        self.sinks = list(sinks)
+        self.context = context
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.records = 0
+        self.stage_name = None
+        self.last_progress = 0.0
+
+    def emit(self, kind, **fields):
+        event = dict(self.context, kind=kind, time=time.time(), **fields)
+        for sink in self.sinks:
+            sink(event)
+
+    def __call__(self, nbytes=0, records=0):
+        self.bytes_read += nbytes
+        self.records += records
+        now = time.perf_counter()
+        if now - self.last_progress >= EVENT_PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.emit_progress()
+
+    def emit_progress(self):
+        self.emit("progress", stage=self.stage_name, bytes_read=self.bytes_read,
+                  total_bytes=self.total_bytes, records=self.records)
+
+    @contextmanager
+    def stage(self, name):
+        self.stage_name = name
+        self.emit("stage", stage=name)
+        started = time.perf_counter()
+        records = self.records
+        yield
+        self.emit_progress()
+        self.emit("stage_done", stage=name, seconds=round(time.perf_counter() - started, 6),
+                  records=self.records - records, peak_rss=peak_rss())
+
+# -------- CACHE --------
+CACHE_MAGIC = b"IGC2"
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_SAMPLE_SIZE = 64 * 1024
+
+class ParseCache:
+    """On-disk cache of parsed username sets, evicted least-recently-used.
+
+    Entries are keyed by path, size, mtime and a hash of the file's first
+    and last blocks; hashing the whole file would cost as much as parsing
+    it. Each entry is zlib-compressed: a JSON header line, the sorted
+    usernames NUL-joined, then their packed metadata as an int64 column.
+    """
+    def __init__(self, directory, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, path, tag=""):
+        st = os.stat(path)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}\0{tag}".encode("utf-8"))
+        with open(path, "rb") as f:
+            h.update(f.read(CACHE_SAMPLE_SIZE))
+            if st.st_size > CACHE_SAMPLE_SIZE:
+                f.seek(max(CACHE_SAMPLE_SIZE, st.st_size - CACHE_SAMPLE_SIZE))
+                h.update(f.read(CACHE_SAMPLE_SIZE))
+        return h.hexdigest()
+
+    def entry_path(self, path, tag=""):
+        return os.path.join(self.directory, self.fingerprint(path, tag) + ".bin")
+
+    def get(self, path, tag=""):
+        try:
+            entry = self.entry_path(path, tag)
+            with open(entry, "rb") as f:
+                data = f.read()
+            if not data.startswith(CACHE_MAGIC):
+                raise OSError("Not a cache entry")
+            header, _, body = zlib.decompress(data[len(CACHE_MAGIC):]).partition(b"\n")
+            header = json.loads(header)
+            names = body[:header["names"]].decode("utf-8").split("\0") if header["names"] else []
+            os.utime(entry)  # mtime doubles as the LRU timestamp
+        except (OSError, ValueError, KeyError, zlib.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        usernames = ParsedUsernames(names)
+        if header["meta"]:
+            meta = array("q")
+            meta.frombytes(body[header["names"]:])
+            usernames.meta = dict(zip(names, meta))
+            usernames.odd_hrefs = header["odd_hrefs"]
+        return usernames
+
+    def put(self, path, usernames, tag=""):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entry = self.entry_path(path, tag)
+            names = sorted(usernames)
+            meta = getattr(usernames, "meta", None)
+            body = "\0".join(names).encode("utf-8")
+            header = {"names": len(body), "meta": bool(meta), "odd_hrefs": getattr(usernames, "odd_hrefs", {})}
+            if meta:
+                body += array("q", (meta.get(name, 0) for name in names)).tobytes()
+            payload = zlib.compress(json.dumps(header).encode("utf-8") + b"\n" + body)
+            with open(entry + ".tmp", "wb") as f:
+                f.write(CACHE_MAGIC + payload)
+            os.replace(entry + ".tmp", entry)
+            self.evict()
+        except OSError:
+            pass
+
+    def evict(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.name.endswith(".bin"):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(entry)
+            total -= size
+
+# -------- RESULTS --------
+RESULT_VIEWS = ("Unfollowers", "Fans", "Mutuals")
+
+class UsernameTable:
+    """Sorted, de-duplicated usernames packed into a single UTF-8 blob.
+
+    Ids are assigned in sort order, so an ascending id array is also an
+    alphabetical list; strings are only decoded when a row is read.
+    """
+    def __init__(self, usernames=()):
+        parts = []
+        self.offsets = array("Q", [0])
+        end = 0
+        for name in usernames:
+            encoded = name.encode("utf-8")
+            parts.append(encoded)
+            end += len(encoded)
+            self.offsets.append(end)
+        self.blob = b"".join(parts)
+
+    @classmethod
+    def build(cls, *groups):
+        """Intern the union of several sets.
+
+        Returns the table, one sorted id array per set and, for sets that
+        carry entry metadata (ParsedUsernames), a packed int64 column aligned
+        with that set's ids (None for the others).
+        """
+        ids = [array("I") for _ in groups]
+        metas = [array("q") if getattr(group, "meta", None) else None for group in groups]
+        def names():
+            for row, name in enumerate(sorted(set().union(*groups))):
+                for group, group_ids, meta in zip(groups, ids, metas):
+                    if name in group:
+                        group_ids.append(row)
+                        if meta is not None:
+                            meta.append(group.meta.get(name, 0))
+                yield name
+        return cls(names()), ids, metas
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        blob, offsets = self.blob, self.offsets
+        for row in range(len(self)):
+            yield blob[offsets[row]:offsets[row + 1]].decode("utf-8")
+
+    def name(self, row):
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].decode("utf-8")
+
+class NameView:
+    """Read-only sequence of usernames behind a sorted id array."""
+    def __init__(self, table, ids):
+        self.table = table
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.table.name(row) for row in self.ids[index]]
+        return self.table.name(self.ids[index])
+
+    def __iter__(self):
+        name = self.table.name
+        for row in self.ids:
+            yield name(row)
+
+def merge_difference(a, b):
+    out = array("I")
+    j, nb = 0, len(b)
+    for x in a:
+        while j < nb and b[j] < x:
+            j += 1
+        if j == nb or b[j] != x:
+            out.append(x)
+    return out
+
+def merge_intersection(a, b):
+    out = array("I")
+    i = j = 0
+    na, nb = len(a), len(b)
+    while i < na and j < nb:
+        if a[i] < b[j]:
+            i += 1
+        elif a[i] > b[j]:
+            j += 1
+        else:
+            out.append(a[i])
+            i += 1
+            j += 1
+    return out
+
+class TimeIndex:
+    """Timestamps sorted into one int64 column, with the matching ids alongside.
+
+    Range queries bisect the time column, so they cost O(log n) plus the size
+    of the answer. Entries without a timestamp (HTML exports) are left out.
+    """
+    def __init__(self, ids=(), meta=None):
+        times = array("q", (packed >> 2 for packed in meta)) if meta is not None else array("q")
+        order = sorted((i for i in range(len(times)) if times[i]), key=times.__getitem__)
+        self.times = array("q", (times[i] for i in order))
+        self.ids = array("I", (ids[i] for i in order))
+
+    def __len__(self):
+        return len(self.times)
+
+    def restrict(self, ids):
+        """Return the index of only the given ids; the time order is kept, so nothing is re-sorted."""
+        mask = bytearray(ids[-1] + 1 if ids else 0)  # ids are sorted
+        for row in ids:
+            mask[row] = 1
+        index = TimeIndex()
+        for t, row in zip(self.times, self.ids):
+            if row < len(mask) and mask[row]:
+                index.times.append(t)
+                index.ids.append(row)
+        return index
+
+    def span(self, start=None, end=None):
+        """Positions of the entries with start <= timestamp < end (either bound optional)."""
+        lo = 0 if start is None else bisect.bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect.bisect_left(self.times, end)
+        return lo, max(lo, hi)
+
+    def between(self, start=None, end=None):
+        lo, hi = self.span(start, end)
+        return array("I", sorted(self.ids[lo:hi]))
+
+    def count(self, start=None, end=None):
+        lo, hi = self.span(start, end)
+        return hi - lo
+
+    def histogram(self, edges):
+        """Entries per [edges[i], edges[i + 1]) bucket, one bisection per edge."""
+        positions = [bisect.bisect_left(self.times, edge) for edge in edges]
+        return [hi - lo for lo, hi in zip(positions, positions[1:])]
+
+def calendar_edges(start, end, unit="month"):
+    """UTC epoch seconds of every month (or year) boundary covering [start, end]."""
+    first = datetime.datetime.fromtimestamp(start, datetime.timezone.utc)
+    year, month = first.year, first.month if unit == "month" else 1
+    edges = []
+    while True:
+        edge = datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc).timestamp()
+        edges.append(int(edge))
+        if edge > end:
+            return edges
+        if unit == "month" and month < 12:
+            month += 1
+        else:
+            year, month = year + 1, 1
+
+class RelationshipResults:
+    """Every relationship view of one comparison, whitelisted and sorted up front.
+
+    Usernames are interned once into a UsernameTable; each relationship is a
+    sorted id array and the views are computed by linear merges over them.
+    JSON entry metadata, when present, is kept as int64 columns aligned with
+    the follower and following id arrays. The whitelist (a WhitelistMatcher,
+    or any collection of exact usernames) is matched in one pass over the
+    table; with_whitelist() re-applies another one without re-interning.
+    Follow dates are queried through TimeIndex objects built on first use.
+    """
+    def __init__(self, followers=frozenset(), following=frozenset(), whitelist=None):
+        self.table, ids, metas = UsernameTable.build(followers, following)
+        follower_ids, following_ids = ids
+        self.follower_meta, self.following_meta = metas
+        self.odd_hrefs = dict(getattr(followers, "odd_hrefs", {}), **getattr(following, "odd_hrefs", {}))
+        self.followers = NameView(self.table, follower_ids)
+        self.following = NameView(self.table, following_ids)
+        self.time_indexes = {}
+        self.apply_whitelist(whitelist)
+
+    def apply_whitelist(self, whitelist):
+        if whitelist is not None and not isinstance(whitelist, WhitelistMatcher):
+            whitelist = WhitelistMatcher(whitelist)
+        if whitelist:
+            whitelist_ids = array("I", (row for row, name in enumerate(self.table) if whitelist.matches(name)))
+        else:
+            whitelist_ids = array("I")
+        # Per-view indexes depend on the whitelist; the follower/following ones do not
+        self.time_indexes = {key: index for key, index in self.time_indexes.items() if key[1] is None}
+        self.whitelist = whitelist
+        self.whitelisted = NameView(self.table, whitelist_ids)
+        follower_ids, following_ids = self.followers.ids, self.following.ids
+        self.unfollowers = NameView(self.table, merge_difference(merge_difference(following_ids, follower_ids), whitelist_ids))
+        self.fans = NameView(self.table, merge_difference(merge_difference(follower_ids, following_ids), whitelist_ids))
+        self.mutuals = NameView(self.table, merge_difference(merge_intersection(follower_ids, following_ids), whitelist_ids))
+
+    def with_whitelist(self, whitelist):
+        """Return a copy sharing this table and metadata, with whitelist applied instead."""
+        results = copy.copy(self)
+        results.apply_whitelist(whitelist)
+        return results
+
+    def view(self, mode):
+        return {"Unfollowers": self.unfollowers, "Fans": self.fans, "Mutuals": self.mutuals}[mode]
+
+    def time_index(self, relationship, mode=None):
+        """TimeIndex of when each follower followed you ("followers") or you followed
+        each account ("following"), optionally narrowed to one view."""
+        key = (relationship, mode)
+        index = self.time_indexes.get(key)
+        if index is None:
+            if mode is not None:
+                index = self.time_index(relationship).restrict(self.view(mode).ids)
+            elif relationship == "followers":
+                index = TimeIndex(self.followers.ids, self.follower_meta)
+            else:
+                index = TimeIndex(self.following.ids, self.following_meta)
+            self.time_indexes[key] = index
+        return index
+
+    def filter_by_date(self, mode, relationship, start=None, end=None):
+        """The view's usernames whose follow date is in [start, end), in alphabetical order."""
+        return NameView(self.table, self.time_index(relationship, mode).between(start, end))
+
+    def packed_meta(self, row, relationship):
+        ids, meta = ((self.followers.ids, self.follower_meta) if relationship == "followers"
+                     else (self.following.ids, self.following_meta))
+        if meta is None:
+            return 0
+        i = bisect.bisect_left(ids, row)
+        return meta[i] if i < len(ids) and ids[i] == row else 0
+
+    def entry_meta(self, row):
+        """Return (followed_you_at, you_followed_at, href) for a table row; 0 / None when unknown."""
+        followed_you = self.packed_meta(row, "followers")
+        you_followed = self.packed_meta(row, "following")
+        code = (you_followed or followed_you) & 3
+        return followed_you >> 2, you_followed >> 2, href_from_code(self.table.name(row), code, self.odd_hrefs)
+
+# -------- WRITING --------
+EXPORT_BATCH = 8192
+EXPORT_FORMATS = ("txt", "csv", "txt.gz", "csv.gz", "igcol")
+RELATIONSHIP_CODES = {"Unfollowers": 1, "Fans": 2, "Mutuals": 3}
+COLUMNAR_MAGIC = b"IGCOL1\n"
+
+def export_format(path):
+    for fmt in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if path.endswith("." + fmt):
+            return fmt
+    return "txt"
+
+def open_text_export(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+def write_text_exports(paths, usernames, progress=None):
+    """Write usernames to every TXT/CSV path (optionally .gz) in one batched pass."""
+    with ExitStack() as stack:
+        files = [stack.enter_context(open_text_export(path)) for path in paths]
+        for path, f in zip(paths, files):
+            if export_format(path).startswith("csv"):
+                f.write("Username\n")
+        for start in range(0, len(usernames), EXPORT_BATCH):
+            batch = usernames[start:start + EXPORT_BATCH]
+            block = "\n".join(batch) + "\n"
+            for f in files:
+                f.write(block)
+            if progress:
+                progress(0, len(batch))
+
+def write_results(path, usernames):
+    write_text_exports([path], usernames)
+
+def write_columnar(path, results, view, progress=None, rows=None):
+    """Write one result view as a column-oriented binary file.
+
+    Layout: COLUMNAR_MAGIC, one JSON header line, then each column in
+    header order. "str" columns are n + 1 uint64 offsets followed by the
+    UTF-8 blob; "u8" and "i64" columns are n little-endian values.
+    Timestamps are Unix seconds, 0 when the export did not have one.
+    rows, a NameView over results.table, narrows the view (e.g. a date filter).
+    """
+    ids = (rows if rows is not None else results.view(view)).ids
+    n = len(ids)
+    columns = [("username", "str"), ("relationship", "u8"), ("followed_you_at", "i64"),
+               ("you_followed_at", "i64"), ("href", "str")]
+    header = {"rows": n, "columns": [{"name": name, "type": kind} for name, kind in columns],
+              "relationships": {code: name for name, code in RELATIONSHIP_CODES.items()}}
+
+    def batches():
+        for start in range(0, n, EXPORT_BATCH):
+            yield ids[start:start + EXPORT_BATCH]
+
+    def write_strings(f, values_of):
+        end = 0
+        f.write(struct.pack("<Q", 0))
+        for batch in batches():
+            offsets = []
+            for value in values_of(batch):
+                end += len(value)
+                offsets.append(end)
+            f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        for batch in batches():
+            f.write(b"".join(values_of(batch)))
+            if progress:
+                progress(0, len(batch))
+
+    def names(batch):
+        return [results.table.name(row).encode("utf-8") for row in batch]
+
+    def hrefs(batch):
+        return [(results.entry_meta(row)[2] or "").encode("utf-8") for row in batch]
+
+    with open(path, "wb") as f:
+        f.write(COLUMNAR_MAGIC + json.dumps(header).encode("utf-8") + b"\n")
+        write_strings(f, names)
+        code = struct.pack("<B", RELATIONSHIP_CODES[view])
+        for batch in batches():
+            f.write(code * len(batch))
+        for relationship in ("followers", "following"):
+            for batch in batches():
+                f.write(struct.pack(f"<{len(batch)}q", *(results.packed_meta(row, relationship) >> 2 for row in batch)))
+        write_strings(f, hrefs)
+
+def read_columnar(path):
+    """Load a file written by write_columnar into {column name: list}."""
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError("Not a columnar export")
+        header = json.loads(f.readline())
+        n = header["rows"]
+        columns = {}
+        for column in header["columns"]:
+            if column["type"] == "str":
+                offsets = struct.unpack(f"<{n + 1}Q", f.read(8 * (n + 1)))
+                blob = f.read(offsets[-1])
+                columns[column["name"]] = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(n)]
+            elif column["type"] == "u8":
+                columns[column["name"]] = list(f.read(n))
+            else:
+                columns[column["name"]] = list(struct.unpack(f"<{n}q", f.read(8 * n)))
+    return columns
+
+def write_exports(results, view, paths, progress=None, rows=None):
+    """Write one view (or the rows shown of it) to every path, picking the format from each extension."""
+    text_paths = [path for path in paths if export_format(path) != "igcol"]
+    if text_paths:
+        write_text_exports(text_paths, rows if rows is not None else results.view(view), progress)
+    for path in paths:
+        if export_format(path) == "igcol":
+            write_columnar(path, results, view, progress, rows)
+
+def auto_save_name(mode, day=None):
+    return f"{mode.lower()}_{(day or datetime.date.today()).isoformat()}.txt"
+
+class ExportEngine:
+    """Writes exports on a background thread, reporting through an event sink.
+
+    Queued jobs for the same view of the same results are merged into one
+    pass, and a path whose format was already written for that view is
+    copied from the earlier file instead of rendered again, so the
+    auto-save and a later user export render the rows once.
+    """
+    def __init__(self, sink):
+        self.sink = sink
+        self.jobs = queue.Queue()
+        self.written = {}
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, results, view, paths, rows=None):
+        self.jobs.put((results, view, list(paths), rows))
+
+    def run(self):
+        while True:
+            results, view, paths, rows = self.jobs.get()
+            deferred = []
+            while not self.jobs.empty():
+                job = self.jobs.get_nowait()
+                if job[0] is results and job[1] == view and job[3] is rows:
+                    paths += job[2]
+                else:
+                    deferred.append(job)
+            for job in deferred:
+                self.jobs.put(job)
+            self.export(results, view, paths, rows)
+
+    def export(self, results, view, paths, rows=None):
+        channel = EventChannel(self.sink, job="export", view=view, paths=paths)
+        try:
+            with channel.stage("export"):
+                # Only the newest results are remembered, and files about to be
+                # overwritten no longer hold what they were recorded with
+                self.written = {key: done for key, done in self.written.items()
+                                if done[0] is results and done[1] not in paths}
+                render = []
+                for path in paths:
+                    done = self.written.get((view, export_format(path)))
+                    if done and done[2] is rows and os.path.exists(done[1]):
+                        shutil.copyfile(done[1], path)
+                    else:
+                        render.append(path)
+                write_exports(results, view, render, channel, rows)
+                for path in paths:
+                    self.written[(view, export_format(path))] = (results, path, rows)
+        except Exception as e:
+            channel.emit("error", stage="export", message=str(e))
+            return
+        channel.emit("done", results=len(rows if rows is not None else results.view(view)))
+
+# -------- HISTORY --------
+HISTORY_CHECKPOINT_EVERY = 10
+HISTORY_BUSY_TIMEOUT = 120.0
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    checkpoint INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_series ON snapshots (account, kind, id);
+CREATE TABLE IF NOT EXISTS snapshot_members (
+    snapshot_id INTEGER NOT NULL,
+    username TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshot_members_snapshot ON snapshot_members (snapshot_id);
+CREATE TABLE IF NOT EXISTS snapshot_changes (
+    snapshot_id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    added INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshot_changes_snapshot ON snapshot_changes (snapshot_id);
+"""
+
+class SnapshotStore:
+    """SQLite history of parsed follower/following sets.
+
+    Each snapshot stores only what was added or removed since the previous
+    one in its series (account + kind); every HISTORY_CHECKPOINT_EVERY-th
+    snapshot also stores its full membership so a set can be rebuilt from
+    the nearest checkpoint. The diff between two snapshots sums the change
+    rows in between, so it costs the size of the change, not of the set.
+    """
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as db:
+            db.executescript(HISTORY_SCHEMA)
+
+    def connect(self):
+        # One short-lived connection per call keeps the store usable from any thread;
+        # WAL and a long busy timeout let batch workers write without "database is locked"
+        db = sqlite3.connect(self.path, timeout=HISTORY_BUSY_TIMEOUT)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return closing(db)
+
+    def snapshots(self, account, kind):
+        with self.connect() as db:
+            return db.execute("SELECT id, taken_at, size, checkpoint FROM snapshots WHERE account = ? AND kind = ? ORDER BY id",
+                              (account, kind)).fetchall()
+
+    def latest(self, account, kind):
+        with self.connect() as db:
+            row = db.execute("SELECT id FROM snapshots WHERE account = ? AND kind = ? ORDER BY id DESC LIMIT 1",
+                             (account, kind)).fetchone()
+        return row[0] if row else None
+
+    def members(self, snapshot_id):
+        with self.connect() as db:
+            account, kind = db.execute("SELECT account, kind FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+            checkpoint = db.execute("SELECT MAX(id) FROM snapshots WHERE account = ? AND kind = ? AND checkpoint = 1 AND id <= ?",
+                                    (account, kind, snapshot_id)).fetchone()[0]
+            usernames = {row[0] for row in db.execute("SELECT username FROM snapshot_members WHERE snapshot_id = ?", (checkpoint,))}
+            changes = db.execute("""SELECT c.username, c.added FROM snapshot_changes c JOIN snapshots s ON s.id = c.snapshot_id
+                                    WHERE s.account = ? AND s.kind = ? AND s.id > ? AND s.id <= ? ORDER BY s.id""",
+                                 (account, kind, checkpoint, snapshot_id))
+            for username, added in changes:
+                if added:
+                    usernames.add(username)
+                else:
+                    usernames.discard(username)
+        return usernames
+
+    def record(self, account, kind, usernames, taken_at=None):
+        previous = self.latest(account, kind)
+        taken_at = taken_at or datetime.datetime.now().isoformat(timespec="seconds")
+        if previous is None:
+            added, removed, checkpoint = usernames, (), True
+        else:
+            before = self.members(previous)
+            added, removed = usernames - before, before - usernames
+            if not added and not removed:
+                return previous
+            with self.connect() as db:
+                since = db.execute("SELECT COUNT(*) FROM snapshots WHERE account = ? AND kind = ? AND id > "
+                                   "(SELECT MAX(id) FROM snapshots WHERE account = ? AND kind = ? AND checkpoint = 1)",
+                                   (account, kind, account, kind)).fetchone()[0]
+            checkpoint = since + 1 >= HISTORY_CHECKPOINT_EVERY
+        with self.connect() as db, db:
+            snapshot_id = db.execute("INSERT INTO snapshots (account, kind, taken_at, size, checkpoint) VALUES (?, ?, ?, ?, ?)",
+                                     (account, kind, taken_at, len(usernames), int(checkpoint))).lastrowid
+            if previous is not None:
+                db.executemany("INSERT INTO snapshot_changes VALUES (?, ?, 1)", ((snapshot_id, u) for u in added))
+                db.executemany("INSERT INTO snapshot_changes VALUES (?, ?, 0)", ((snapshot_id, u) for u in removed))
+            if checkpoint:
+                db.executemany("INSERT INTO snapshot_members VALUES (?, ?)", ((snapshot_id, u) for u in usernames))
+        return snapshot_id
+
+    def diff(self, from_id, to_id):
+        """Return (added, removed) usernames between two snapshots of one series."""
+        if from_id > to_id:
+            removed, added = self.diff(to_id, from_id)
+            return added, removed
+        with self.connect() as db:
+            account, kind = db.execute("SELECT account, kind FROM snapshots WHERE id = ?", (from_id,)).fetchone()
+            rows = db.execute("""SELECT c.username, SUM(CASE WHEN c.added THEN 1 ELSE -1 END) AS net
+                                 FROM snapshots s JOIN snapshot_changes c ON c.snapshot_id = s.id
+                                 WHERE s.account = ? AND s.kind = ? AND s.id > ? AND s.id <= ?
+                                 GROUP BY c.username HAVING net != 0""",
+                              (account, kind, from_id, to_id)).fetchall()
+        added = sorted(u for u, net in rows if net > 0)
+        removed = sorted(u for u, net in rows if net < 0)
+        return added, removed
+
+    def lost_followers(self, account, since_id):
+        return self.diff(since_id, self.latest(account, "followers"))[1]
+
+    def new_followers(self, account, since_id):
+        return self.diff(since_id, self.latest(account, "followers"))[0]
+
+    def churn(self, account, kind="followers"):
+        """Return (id, taken_at, size, added, removed) per snapshot, oldest first."""
+        with self.connect() as db:
+            return db.execute("""SELECT s.id, s.taken_at, s.size,
+                                        COALESCE(SUM(c.added), 0), COUNT(c.username) - COALESCE(SUM(c.added), 0)
+                                 FROM snapshots s LEFT JOIN snapshot_changes c ON c.snapshot_id = s.id
+                                 WHERE s.account = ? AND s.kind = ? GROUP BY s.id ORDER BY s.id""",
+                              (account, kind)).fetchall()
+
+# -------- SEARCH --------
+SEARCH_NGRAM = 3
+SEARCH_BATCH = 4096
+SEARCH_INDEX_LIMIT = 3  # one per result view
+
+@functools.lru_cache(maxsize=64)
+def compile_search_pattern(query):
+    return re.compile(query)
+
+class SearchCancelled(Exception):
+    pass
+
+class SearchIndex:
+    """Lowercased copy of one result list plus an n-gram -> row index.
+
+    Substring queries intersect the posting lists of their n-grams and only
+    verify those candidates. A query that extends the previous one only
+    re-checks the previous matches.
+    """
+    def __init__(self, items):
+        self.items = items
+        self.lowered = [u.lower() for u in items]
+        self.grams = {}
+        for row, name in enumerate(self.lowered):
+            for gram in {name[i:i + SEARCH_NGRAM] for i in range(len(name) - SEARCH_NGRAM + 1)}:
+                postings = self.grams.get(gram)
+                if postings is None:
+                    postings = self.grams[gram] = array("I")
+                postings.append(row)
+        self.last_query = None
+        self.last_rows = None
+
+    def candidates(self, query):
+        grams = {query[i:i + SEARCH_NGRAM] for i in range(len(query) - SEARCH_NGRAM + 1)}
+        postings = sorted((self.grams.get(gram, ()) for gram in grams), key=len)
+        rows = set(postings[0])
+        for other in postings[1:]:
+            if not rows:
+                break
+            rows.intersection_update(other)
+        return sorted(rows)
+
+    def scan(self, rows, match, cancelled):
+        lowered = self.lowered
+        found = []
+        for start in range(0, len(rows), SEARCH_BATCH):
+            if cancelled():
+                raise SearchCancelled()
+            found.extend(row for row in rows[start:start + SEARCH_BATCH] if match(lowered[row]))
+        return found
+
+    def search(self, query, regex=False, cancelled=lambda: False):
+        if regex:
+            rows = self.scan(range(len(self.lowered)), compile_search_pattern(query).search, cancelled)
+        else:
+            if self.last_query is not None and self.last_query in query:
+                rows = self.last_rows
+            elif len(query) >= SEARCH_NGRAM:
+                rows = self.candidates(query)
+            else:
+                rows = range(len(self.lowered))
+            rows = self.scan(rows, lambda name: query in name, cancelled)
+            self.last_query, self.last_rows = query, rows
+        # Matches of a result view stay ids into its table rather than a million strings
+        if isinstance(self.items, NameView):
+            return NameView(self.items.table, array("I", (self.items.ids[row] for row in rows)))
+        return [self.items[row] for row in rows]
+
+class SearchEngine:
+    """Answers searches on a worker thread; only the newest query is delivered.
+
+    Every submit bumps a generation counter. The worker drops queued jobs that
+    were superseded and running scans notice the bump between batches.
+    """
+    def __init__(self, on_result):
+        self.on_result = on_result
+        self.indexes = {}
+        self.generation = 0
+        self.jobs = queue.Queue()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def reset(self):
+        self.indexes = {}
+
+    def prepare(self, items):
+        self.jobs.put((None, items, None, False))
+
+    def submit(self, items, query, regex=False):
+        self.generation += 1
+        self.jobs.put((self.generation, items, query, regex))
+        return self.generation
+
+    def cancel(self):
+        self.generation += 1
+
+    def index(self, items):
+        # Most recently used last; older indexes are dropped so filtered
+        # views that are no longer shown do not keep their index alive
+        index = self.indexes.pop(id(items), None)
+        if index is None or index.items is not items:
+            index = SearchIndex(items)
+        self.indexes[id(items)] = index
+        while len(self.indexes) > SEARCH_INDEX_LIMIT:
+            del self.indexes[next(iter(self.indexes))]
+        return index
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            while not self.jobs.empty():
+                pending = self.jobs.get_nowait()
+                if pending[0] is not None or job[0] is None:
+                    job = pending
+            generation, items, query, regex = job
+            if generation is None:
+                self.index(items)
+                continue
+            cancelled = lambda: generation != self.generation
+            try:
+                matches = self.index(items).search(query, regex, cancelled)
+            except SearchCancelled:
+                continue
+            except re.error:
+                matches = None
+            if not cancelled():
+                self.on_result(generation, matches)
+
+# -------- WATCHING --------
+WATCH_INTERVAL = 2.0
+WATCH_DEBOUNCE = 3.0
+
+def is_export_file(name, depth=0):
+    """Whether a file can belong to an account: export ZIPs directly in a watched
+    folder (depth 0), followers/following files at any depth."""
+    return (depth == 0 and name.endswith(".zip")) or EXPORT_MEMBER_RE.fullmatch(name) is not None
+
+class FolderWatcher:
+    """Polls folders for new, changed or removed export files.
+
+    Each poll is one os.scandir walk comparing (size, mtime) from the
+    directory entries, and the watcher sleeps between polls. Changes are held
+    back until nothing has changed for `debounce` seconds, so a burst of
+    drops, or a file still being copied, arrives as a single batch.
+    """
+    def __init__(self, paths, interval=WATCH_INTERVAL, debounce=WATCH_DEBOUNCE):
+        self.paths = list(paths)
+        self.interval = interval
+        self.debounce = debounce
+        self.state = {}
+        self.pending = set()
+        self.last_change = None
+
+    def scan(self):
+        found = {}
+        folders = []
+        for path in self.paths:
+            try:
+                if os.path.isdir(path):
+                    folders.append((path, 0))
+                else:
+                    st = os.stat(path)
+                    found[path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                pass
+        while folders:
+            folder, depth = folders.pop()
+            try:
+                entries = os.scandir(folder)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            folders.append((entry.path, depth + 1))
+                        elif is_export_file(entry.name, depth):
+                            st = entry.stat()
+                            found[entry.path] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        pass  # removed mid-scan
+        return found
+
+    def poll(self, now=None):
+        """Scan once; return the sorted batch of changed paths once the folders have settled, else []."""
+        now = time.monotonic() if now is None else now
+        found = self.scan()
+        changed = {path for path, signature in found.items() if self.state.get(path) != signature}
+        changed.update(self.state.keys() - found.keys())
+        self.state = found
+        if changed:
+            self.pending |= changed
+            self.last_change = now
+        if self.pending and now - self.last_change >= self.debounce:
+            batch, self.pending = sorted(self.pending), set()
+            return batch
+        return []
+
+    def watch(self, stop=None):
+        """Yield batches until stop (a threading.Event) is set; the first batch is every file present."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            batch = self.poll()
+            if batch:
+                yield batch
+            stop.wait(self.interval)
+
+# -------- OVERLAP --------
+# int.bit_count is Python 3.10+
+popcount = getattr(int, "bit_count", None) or (lambda bits: bin(bits).count("1"))
+
+def rows_to_bitset(rows, size):
+    bitmap = bytearray((size + 7) // 8)
+    for row in rows:
+        bitmap[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bitmap, "little")
+
+def bitset_rows(bits):
+    """Ascending set-bit positions of a non-negative int, as an id array."""
+    rows = array("I")
+    for i, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+        if byte:
+            rows.extend((i << 3) + j for j in range(8) if byte >> j & 1)
+    return rows
+
+AUDIENCE_OPERATORS = {
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.Sub: lambda a, b: a & ~b,
+}
+
+class AudienceMatrix:
+    """Audiences of several accounts as bitsets over one shared username table.
+
+    Bit i of an account's bitset is set when row i of the table follows that
+    account, so a pairwise overlap or a boolean audience query is a handful
+    of big-int operations instead of Python set operations per username.
+    """
+    def __init__(self, audiences):
+        self.labels = list(audiences)
+        names = sorted(set().union(*audiences.values()))
+        rows = {name: row for row, name in enumerate(names)}
+        self.table = UsernameTable(names)
+        self.bits = {label: rows_to_bitset(map(rows.__getitem__, audience), len(names))
+                     for label, audience in audiences.items()}
+        self.sizes = {label: popcount(bits) for label, bits in self.bits.items()}
+        self.everyone = (1 << len(names)) - 1
+
+    def overlaps(self):
+        """N x N matrix of shared follower counts, in label order."""
+        bits = [self.bits[label] for label in self.labels]
+        matrix = [[0] * len(bits) for _ in bits]
+        for i, a in enumerate(bits):
+            matrix[i][i] = self.sizes[self.labels[i]]
+            for j in range(i + 1, len(bits)):
+                matrix[i][j] = matrix[j][i] = popcount(a & bits[j])
+        return matrix
+
+    def jaccard(self):
+        """N x N matrix of |A & B| / |A | B|, in label order."""
+        shared = self.overlaps()
+        sizes = [self.sizes[label] for label in self.labels]
+        return [[count / (sizes[i] + sizes[j] - count) if count else 0.0 for j, count in enumerate(row)]
+                for i, row in enumerate(shared)]
+
+    def label(self, node):
+        label = node.id if isinstance(node, ast.Name) else node.value
+        if label not in self.bits:
+            raise ValueError(f"Unknown account {label!r}")
+        return label
+
+    def evaluate(self, expression):
+        """Evaluate a query such as `A & B - others(A, B)` to a bitset.
+
+        Accounts are bare names or quoted strings; & | ^ - and ~ (everyone
+        else in the matrix) combine them, and others(...) is the union of
+        every account not listed. Nothing else is accepted.
+        """
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid query: {e.msg}") from None
+
+        def visit(node):
+            if isinstance(node, ast.Name) or (isinstance(node, ast.Constant) and isinstance(node.value, str)):
+                return self.bits[self.label(node)]
+            if isinstance(node, ast.BinOp) and type(node.op) in AUDIENCE_OPERATORS:
+                return AUDIENCE_OPERATORS[type(node.op)](visit(node.left), visit(node.right))
+            if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Invert):
+                return self.everyone & ~visit(node.operand)
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "others"
+                    and not node.keywords and all(isinstance(arg, ast.Name) or (isinstance(arg, ast.Constant) and isinstance(arg.value, str))
+                                                  for arg in node.args)):
+                excluded = {self.label(arg) for arg in node.args}
+                return functools.reduce(operator.or_, (bits for label, bits in self.bits.items() if label not in excluded), 0)
+            raise ValueError(f"Unsupported query syntax: {ast.unparse(node)}")
+        return visit(tree.body)
+
+    def query(self, expression):
+        return NameView(self.table, bitset_rows(self.evaluate(expression)))
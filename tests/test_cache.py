@@ -0,0 +1,77 @@
+"""Parse cache entries read back exactly as they were stored."""
+import os
+import tempfile
+import unittest
+
+from ig_engine import ParseCache, ParsedUsernames
+
+def sample_usernames():
+    usernames = ParsedUsernames()
+    usernames.add_entry("alice", "https://www.instagram.com/alice", 1600000000)
+    usernames.add_entry("bob", "https://www.instagram.com/_u/bob", 1600000001)
+    usernames.add_entry("çağrı", "https://example.com/odd", 1600000002)
+    usernames.add_entry("名前")
+    return usernames
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self.directory.name, "cache"))
+        self.source = os.path.join(self.directory.name, "followers_1.json")
+        with open(self.source, "w", encoding="utf-8") as f:
+            f.write("[]")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_keeps_metadata(self):
+        usernames = sample_usernames()
+        self.cache.put(self.source, usernames)
+        cached = self.cache.get(self.source)
+        self.assertEqual(cached, usernames)
+        self.assertEqual(cached.meta, usernames.meta)
+        self.assertEqual(cached.odd_hrefs, {"çağrı": "https://example.com/odd"})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 0))
+
+    def test_round_trip_without_metadata(self):
+        for usernames in ({"plain", "html", "names"}, set()):
+            with self.subTest(usernames=usernames):
+                self.cache.put(self.source, usernames)
+                cached = self.cache.get(self.source)
+                self.assertEqual(cached, usernames)
+                self.assertEqual(cached.meta, {})
+
+    def test_tags_are_separate_entries(self):
+        self.cache.put(self.source, {"a"}, tag="followers")
+        self.cache.put(self.source, {"b"}, tag="following")
+        self.assertEqual(self.cache.get(self.source, tag="followers"), {"a"})
+        self.assertEqual(self.cache.get(self.source, tag="following"), {"b"})
+        self.assertIsNone(self.cache.get(self.source))
+
+    def test_changed_file_misses(self):
+        self.cache.put(self.source, {"a"})
+        with open(self.source, "w", encoding="utf-8") as f:
+            f.write('[{"title": ""}]')
+        self.assertIsNone(self.cache.get(self.source))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_corrupt_entry_misses(self):
+        self.cache.put(self.source, {"a"})
+        with open(self.cache.entry_path(self.source), "r+b") as f:
+            f.seek(8)
+            f.write(b"garbage")
+        self.assertIsNone(self.cache.get(self.source))
+
+    def test_eviction_drops_the_least_recently_used(self):
+        for age, tag in enumerate(("a", "b")):
+            self.cache.put(self.source, {tag * 50}, tag=tag)
+            os.utime(self.cache.entry_path(self.source, tag), (1000 + age, 1000 + age))
+        self.cache.get(self.source, tag="a")  # now the most recently used
+        self.cache.max_bytes = 2 * os.path.getsize(self.cache.entry_path(self.source, "a"))
+        self.cache.put(self.source, {"c" * 50}, tag="c")
+        self.assertIsNone(self.cache.get(self.source, tag="b"))
+        self.assertEqual(self.cache.get(self.source, tag="a"), {"a" * 50})
+        self.assertEqual(self.cache.get(self.source, tag="c"), {"c" * 50})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Headless account discovery, per-account error handling and folder watching."""
+import json
+import os
+import tempfile
+import unittest
+
+from ig_cli import find_accounts, process_account
+from ig_engine import FolderWatcher
+
+def write_export(path, names, key=None):
+    entries = [{"title": "", "string_list_data": [{"href": f"https://www.instagram.com/{name}", "value": name,
+                                                   "timestamp": 1600000000}]} for name in names]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({key: entries} if key else entries, f)
+
+class ProcessAccountTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.output = os.path.join(self.root, "out")
+        write_export(os.path.join(self.root, "alice", "followers_1.json"), ["a", "b"])
+        write_export(os.path.join(self.root, "alice", "following.json"), ["b", "c"], "relationships_following")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def account(self):
+        accounts = find_accounts([self.root])
+        self.assertEqual([account["name"] for account in accounts], ["alice"])
+        return accounts[0]
+
+    def test_writes_every_view(self):
+        summary = process_account(self.account(), None, self.output, "txt")
+        self.assertNotIn("error", summary)
+        self.assertEqual((summary["followers"], summary["following"], summary["unfollowers"], summary["fans"],
+                          summary["mutuals"]), (2, 2, 1, 1, 1))
+        with open(os.path.join(self.output, "alice", "unfollowers.txt"), encoding="utf-8") as f:
+            self.assertEqual(f.read().splitlines(), ["c"])
+
+    def test_missing_input_is_an_account_error(self):
+        account = self.account()
+        os.remove(account["following"][0])
+        summary = process_account(account, None, self.output, "txt")
+        self.assertIn("error", summary)
+        self.assertIn("seconds", summary)
+
+    def test_bad_export_is_traced(self):
+        account = self.account()
+        with open(account["followers"][0], "w", encoding="utf-8") as f:
+            f.write('{"something_else": []}')
+        trace_path = os.path.join(self.root, "trace.jsonl")
+        summary = process_account(account, None, self.output, "txt", trace_path=trace_path)
+        self.assertIn("Unknown JSON structure", summary["error"])
+        with open(trace_path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual(events[-1]["kind"], "error")
+        self.assertEqual(events[-1]["stage"], "parse")
+
+    def test_unwritable_trace_is_an_account_error(self):
+        summary = process_account(self.account(), None, self.output, "txt",
+                                  trace_path=os.path.join(self.root, "missing", "trace.jsonl"))
+        self.assertIn("error", summary)
+
+class FolderWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.watcher = FolderWatcher([self.root], debounce=3.0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def drop(self, *parts, content="[]"):
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_changes_wait_for_the_folder_to_settle(self):
+        first = self.drop("alice.zip")
+        self.assertEqual(self.watcher.poll(now=0), [])
+        second = self.drop("bob", "followers_1.json")
+        self.assertEqual(self.watcher.poll(now=2), [])  # resets the debounce
+        self.assertEqual(self.watcher.poll(now=4), [])
+        self.assertEqual(self.watcher.poll(now=5), sorted([first, second]))
+        self.assertEqual(self.watcher.poll(now=100), [])
+
+    def test_modified_and_removed_files_are_reported(self):
+        path = self.drop("alice", "following.json")
+        self.watcher.poll(now=0)
+        self.watcher.poll(now=10)
+        self.drop("alice", "following.json", content="[1, 2]")
+        self.watcher.poll(now=20)
+        self.assertEqual(self.watcher.poll(now=23), [path])
+        os.remove(path)
+        self.watcher.poll(now=30)
+        self.assertEqual(self.watcher.poll(now=33), [path])
+
+    def test_only_export_files_are_watched(self):
+        self.drop("notes.txt")
+        self.drop("alice", "nested.zip")  # archives only count directly in the watched folder
+        self.drop("alice", "posts_1.json")
+        self.watcher.poll(now=0)
+        self.assertEqual(self.watcher.poll(now=10), [])
+
+if __name__ == "__main__":
+    unittest.main()
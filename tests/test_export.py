@@ -0,0 +1,145 @@
+"""Export formats read back, and the background exporter's merging and copying."""
+import gzip
+import os
+import queue
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import ig_engine
+from ig_engine import ExportEngine, ParsedUsernames, RelationshipResults, read_columnar, write_exports
+
+def sample_results():
+    followers, following = ParsedUsernames(), ParsedUsernames()
+    for i in range(20000):
+        name = f"user{i:05d}" if i % 50 else f"ünïcode{i}"
+        if i % 3:
+            followers.add_entry(name, f"https://www.instagram.com/{name}", 1600000000 + i)
+        if i % 4:
+            following.add_entry(name, f"https://www.instagram.com/_u/{name}", 1650000000 + i)
+    following.add_entry("odd", "https://example.com/odd", 1700000000)
+    return RelationshipResults(followers, following)
+
+class WriteExportsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.results = sample_results()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_text_formats(self):
+        paths = [self.path(name) for name in ("a.txt", "a.csv", "a.txt.gz", "a.csv.gz")]
+        write_exports(self.results, "Fans", paths)
+        expected = list(self.results.fans)
+        for path in paths:
+            with self.subTest(path=os.path.basename(path)):
+                opener = gzip.open if path.endswith(".gz") else open
+                with opener(path, "rt", encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+                self.assertEqual(lines, (["Username"] if ".csv" in path else []) + expected)
+
+    def test_columnar_round_trip(self):
+        for mode in ("Unfollowers", "Fans", "Mutuals"):
+            with self.subTest(mode=mode):
+                path = self.path(f"{mode}.igcol")
+                write_exports(self.results, mode, [path])
+                columns = read_columnar(path)
+                view = self.results.view(mode)
+                self.assertEqual(columns["username"], list(view))
+                self.assertEqual(set(columns["relationship"]), {ig_engine.RELATIONSHIP_CODES[mode]})
+                metas = [self.results.entry_meta(row) for row in view.ids]
+                self.assertEqual(columns["followed_you_at"], [meta[0] for meta in metas])
+                self.assertEqual(columns["you_followed_at"], [meta[1] for meta in metas])
+                self.assertEqual(columns["href"], [meta[2] or "" for meta in metas])
+        self.assertIn("https://example.com/odd", read_columnar(self.path("Unfollowers.igcol"))["href"])
+
+    def test_rows_narrow_every_format(self):
+        rows = self.results.filter_by_date("Mutuals", "followers", start=1600005000, end=1600006000)
+        write_exports(self.results, "Mutuals", [self.path("m.txt"), self.path("m.igcol")], rows=rows)
+        with open(self.path("m.txt"), encoding="utf-8") as f:
+            self.assertEqual(f.read().splitlines(), list(rows))
+        self.assertEqual(read_columnar(self.path("m.igcol"))["username"], list(rows))
+
+    def test_not_a_columnar_file(self):
+        with open(self.path("x.igcol"), "wb") as f:
+            f.write(b"nope\n")
+        with self.assertRaises(ValueError):
+            read_columnar(self.path("x.igcol"))
+
+class ExportEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.results = sample_results()
+        self.events = queue.Queue()
+        self.busy = threading.Event()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def sink(self, event):
+        # Holds the worker inside its first job so later submits queue up behind it
+        self.busy.set()
+        self.release.wait(5)
+        self.events.put(event)
+
+    def finished(self, count):
+        done = []
+        while len(done) < count:
+            event = self.events.get(timeout=10)
+            self.assertNotEqual(event["kind"], "error", event.get("message"))
+            if event["kind"] == "done":
+                done.append(event["paths"])
+        return done
+
+    def test_queued_jobs_merge_and_reuse_written_files(self):
+        with mock.patch("ig_engine.write_exports", wraps=write_exports) as writes:
+            engine = ExportEngine(self.sink)
+            engine.submit(self.results, "Fans", [self.path("auto.txt")])
+            self.assertTrue(self.busy.wait(5))
+            engine.submit(self.results, "Fans", [self.path("user.txt")])
+            engine.submit(self.results, "Fans", [self.path("user.csv")])
+            engine.submit(self.results, "Mutuals", [self.path("mutuals.txt")])
+            self.release.set()
+            done = self.finished(3)
+        self.assertEqual(done, [[self.path("auto.txt")], [self.path("user.txt"), self.path("user.csv")],
+                                [self.path("mutuals.txt")]])
+        # user.txt was copied from auto.txt; only the CSV and the other view were rendered
+        rendered = [call.args[2] for call in writes.call_args_list]
+        self.assertEqual(rendered, [[self.path("auto.txt")], [self.path("user.csv")], [self.path("mutuals.txt")]])
+        with open(self.path("auto.txt"), encoding="utf-8") as a, open(self.path("user.txt"), encoding="utf-8") as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_filtered_rows_are_rendered_separately(self):
+        rows = self.results.filter_by_date("Fans", "followers", end=1600001000)
+        with mock.patch("ig_engine.write_exports", wraps=write_exports) as writes:
+            engine = ExportEngine(self.sink)
+            self.release.set()
+            engine.submit(self.results, "Fans", [self.path("auto.txt")])
+            self.finished(1)
+            engine.submit(self.results, "Fans", [self.path("filtered.txt")], rows)
+            self.finished(1)
+        self.assertEqual([call.args[2] for call in writes.call_args_list],
+                         [[self.path("auto.txt")], [self.path("filtered.txt")]])
+        with open(self.path("filtered.txt"), encoding="utf-8") as f:
+            self.assertEqual(f.read().splitlines(), list(rows))
+
+    def test_errors_are_reported(self):
+        engine = ExportEngine(self.sink)
+        self.release.set()
+        engine.submit(self.results, "Fans", [self.path("missing/dir/out.txt")])
+        event = self.events.get(timeout=10)
+        while event["kind"] not in ("error", "done"):
+            event = self.events.get(timeout=10)
+        self.assertEqual(event["kind"], "error")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Snapshot deltas and checkpoint rebuilds against the full sets they replace."""
+import os
+import random
+import tempfile
+import unittest
+
+from ig_engine import HISTORY_CHECKPOINT_EVERY, SnapshotStore
+
+class SnapshotStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(os.path.join(self.directory.name, "history.sqlite"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record_series(self, seed, snapshots=HISTORY_CHECKPOINT_EVERY * 2 + 5):
+        rng = random.Random(seed)
+        current = {f"user{i}" for i in range(200)}
+        truth = {}
+        for n in range(snapshots):
+            current = {u for u in current if rng.random() > 0.05} | {f"new{seed}_{n}_{i}" for i in range(rng.randrange(1, 10))}
+            # Two accounts interleave, so series must not bleed into each other
+            truth[self.store.record("a", "followers", set(current), taken_at=f"2024-01-{n + 1:02d}")] = set(current)
+            self.store.record("b", "followers", {f"other{n}"})
+        return truth
+
+    def test_members_rebuild_across_checkpoints(self):
+        truth = self.record_series(seed=1)
+        checkpoints = [row[0] for row in self.store.snapshots("a", "followers") if row[3]]
+        self.assertGreaterEqual(len(checkpoints), 3)
+        for snapshot_id, usernames in truth.items():
+            self.assertEqual(self.store.members(snapshot_id), usernames)
+
+    def test_diff_matches_set_differences(self):
+        truth = self.record_series(seed=2)
+        ids = sorted(truth)
+        rng = random.Random(3)
+        for _ in range(30):
+            a, b = rng.choice(ids), rng.choice(ids)
+            added, removed = self.store.diff(a, b)
+            self.assertEqual(added, sorted(truth[b] - truth[a]))
+            self.assertEqual(removed, sorted(truth[a] - truth[b]))
+        self.assertEqual(self.store.lost_followers("a", ids[0]), sorted(truth[ids[0]] - truth[ids[-1]]))
+        self.assertEqual(self.store.new_followers("a", ids[0]), sorted(truth[ids[-1]] - truth[ids[0]]))
+
+    def test_unchanged_set_is_not_recorded_again(self):
+        first = self.store.record("a", "following", {"x", "y"})
+        self.assertEqual(self.store.record("a", "following", {"y", "x"}), first)
+        self.assertEqual(len(self.store.snapshots("a", "following")), 1)
+
+    def test_churn_counts_changes(self):
+        self.store.record("a", "followers", {"x", "y"})
+        self.store.record("a", "followers", {"y", "z", "w"})
+        churn = self.store.churn("a")
+        self.assertEqual([row[2:] for row in churn], [(2, 0, 0), (3, 2, 1)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Bitset audience overlaps and queries against plain Python sets."""
+import random
+import unittest
+
+from ig_engine import AudienceMatrix, bitset_rows, rows_to_bitset
+
+class AudienceMatrixTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        people = [f"user{i}" for i in range(3000)]
+        self.audiences = {name: set(rng.sample(people, rng.randrange(0, 1500))) for name in ("A", "B", "C", "brand d")}
+        self.audiences["empty"] = set()
+        self.matrix = AudienceMatrix(self.audiences)
+
+    def test_bitset_round_trip(self):
+        rows = [0, 1, 7, 8, 9, 63, 64, 1000]
+        self.assertEqual(list(bitset_rows(rows_to_bitset(rows, 1001))), rows)
+        self.assertEqual(list(bitset_rows(0)), [])
+
+    def test_overlaps_and_jaccard(self):
+        sets = [self.audiences[label] for label in self.matrix.labels]
+        for i, row in enumerate(self.matrix.overlaps()):
+            self.assertEqual(row, [len(sets[i] & other) for other in sets])
+        for i, row in enumerate(self.matrix.jaccard()):
+            for j, value in enumerate(row):
+                union = len(sets[i] | sets[j])
+                self.assertAlmostEqual(value, len(sets[i] & sets[j]) / union if union and sets[i] & sets[j] else 0.0)
+
+    def test_queries_match_set_operations(self):
+        a, b, c, d = (self.audiences[k] for k in ("A", "B", "C", "brand d"))
+        everyone = set().union(*self.audiences.values())
+        cases = {
+            "A & B": a & b,
+            "A | B": a | b,
+            "A ^ C": a ^ c,
+            "A - B": a - b,
+            "~A": everyone - a,
+            "A & B - others(A, B)": (a & b) - (c | d),
+            "'brand d' & ~(A | \"B\")": d - a - b,
+            "others()": everyone,
+            "empty | C": c,
+        }
+        for expression, expected in cases.items():
+            with self.subTest(expression=expression):
+                self.assertEqual(list(self.matrix.query(expression)), sorted(expected))
+
+    def test_rejects_anything_else(self):
+        for expression in ("A + B", "Z", "__import__('os')", "A.real", "others(A, x=B)", "(", "1", "A if B else C", "f(A)"):
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                self.matrix.query(expression)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Parsers checked against the original json.load / re.findall behaviour."""
+import io
+import json
+import os
+import re
+import tempfile
+import unittest
+
+from ig_engine import (
+    JSONStream, extract_html_usernames, html_chunk_bounds, iter_json_usernames, parse_json_usernames,
+    scan_html_usernames,
+)
+
+# The original app's parsers, kept verbatim as the reference
+def baseline_json_usernames(data):
+    if isinstance(data, list):
+        items = data
+    elif "relationships_following" in data:
+        items = data["relationships_following"]
+    elif "relationships_followers" in data:
+        items = data["relationships_followers"]
+    else:
+        raise ValueError("Unknown JSON structure")
+    return {item["string_list_data"][0]["value"] for item in items if "string_list_data" in item and item["string_list_data"]}
+
+def baseline_html_usernames(html):
+    return set(re.findall(r'href="https://www.instagram.com/(?:_u/)?([^"/]+)"', html))
+
+NAMES = ["alice", "bob.smith", "çağrı_ünal", "名前", "q\"uote", "back\\slash", "emoji😀", "x" * 300]
+
+def entry(name, i):
+    return {"title": "", "media_list_data": [],
+            "string_list_data": [{"href": f"https://www.instagram.com/{name}", "value": name, "timestamp": 1600000000 + i}]}
+
+def export_documents():
+    entries = [entry(name, i) for i, name in enumerate(NAMES)] + [{"title": "", "string_list_data": []}, {"title": "no list"}]
+    yield entries
+    yield {"relationships_following": entries}
+    yield {"other": {"nested": [1, {"a": "]"}]}, "relationships_followers": entries, "after": "}"}
+    yield []
+    yield {"relationships_following": []}
+
+class JSONStreamTest(unittest.TestCase):
+    def test_matches_json_load_at_every_chunk_size(self):
+        for document in export_documents():
+            for indent in (None, 2):
+                raw = json.dumps(document, indent=indent, ensure_ascii=False).encode("utf-8")
+                expected = baseline_json_usernames(json.loads(raw))
+                # Small chunks split multi-byte characters, escapes and numbers at the buffer edge
+                for chunk_size in list(range(1, 40)) + [4096]:
+                    with self.subTest(document=str(document)[:40], indent=indent, chunk_size=chunk_size):
+                        self.assertEqual(set(iter_json_usernames(io.BytesIO(raw), chunk_size)), expected)
+
+    def test_keeps_timestamps_and_hrefs(self):
+        raw = json.dumps(next(export_documents())).encode("utf-8")
+        usernames = parse_json_usernames(io.BytesIO(raw))
+        self.assertEqual(usernames.meta["bob.smith"] >> 2, 1600000001)
+
+    def test_reports_records_while_parsing(self):
+        raw = json.dumps([entry(f"user{i}", i) for i in range(10000)]).encode("utf-8")
+        calls = []
+        usernames = parse_json_usernames(io.BytesIO(raw), lambda nbytes=0, records=0: calls.append((nbytes, records)))
+        counts = [records for _, records in calls if records]
+        self.assertGreater(len(counts), 1)
+        self.assertEqual(sum(counts), len(usernames))
+        self.assertEqual(sum(nbytes for nbytes, _ in calls), len(raw))
+
+    def test_unknown_structure_is_an_error(self):
+        for raw in (b'{"something_else": []}', b'"text"', b"{}"):
+            with self.subTest(raw=raw), self.assertRaises(ValueError):
+                list(iter_json_usernames(io.BytesIO(raw)))
+
+    def test_truncated_file_is_an_error(self):
+        raw = json.dumps(next(export_documents())).encode("utf-8")[:-20]
+        with self.assertRaises(ValueError):
+            list(iter_json_usernames(io.BytesIO(raw), 7))
+
+    def test_oversized_entry_stops_reading(self):
+        raw = b'[{"title": "' + b"x" * (1024 * 1024)
+        f = io.BytesIO(raw)
+        with self.assertRaisesRegex(ValueError, "larger than"):
+            list(JSONStream(f, 256, max_entry=4096).iter_array())
+        self.assertLess(f.tell(), 8192)
+        # An entry under the cap still decodes across many refills
+        raw = json.dumps([entry("y" * 1500, 0)]).encode("utf-8")
+        self.assertEqual(len(list(JSONStream(io.BytesIO(raw), 256, max_entry=4096).iter_array())), 1)
+
+def sample_html():
+    rows = []
+    for i, name in enumerate(n for n in NAMES if '"' not in n and "/" not in n):
+        prefix = "_u/" if i % 2 else ""
+        rows.append(f'<div class="pam"><a target="_blank" href="https://www.instagram.com/{prefix}{name}">{name}</a>'
+                    f'<div>Jan {i + 1:02d}, 2024</div></div>')
+    rows.append('<a href="https://www.instagram.com/accounts/settings/">settings</a><a href="">empty</a>')
+    rows.append('<a title="href=" href="https://www.instagram.com/tricky">x</a>')
+    return "<html><body>" + "\n".join(rows * 3) + "</body></html>"
+
+class HTMLScanTest(unittest.TestCase):
+    def test_chunked_scan_matches_findall_at_every_cut(self):
+        html = sample_html()
+        buf = html.encode("utf-8")
+        expected = baseline_html_usernames(html)
+        for chunk_size in range(1, 120):
+            with self.subTest(chunk_size=chunk_size):
+                found = set()
+                for start, end in html_chunk_bounds(buf, chunk_size):
+                    found |= scan_html_usernames(buf, start, end)
+                self.assertEqual(found, expected)
+
+    def test_parallel_file_scan_matches_findall(self):
+        html = sample_html()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "followers_1.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(html)
+            expected = baseline_html_usernames(html)
+            self.assertEqual(extract_html_usernames(path, max_workers=1), expected)
+            self.assertEqual(extract_html_usernames(path, threshold=0, chunk_size=64, max_workers=2), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""Relationship views and follow-date indexes against plain set and list operations."""
+import datetime
+import random
+import unittest
+
+from ig_engine import ParsedUsernames, RelationshipResults, TimeIndex, calendar_edges
+
+DAY = 86400
+START = 1577836800  # 2020-01-01 UTC
+
+def dated(names, rng, undated=0.1):
+    usernames = ParsedUsernames()
+    for name in names:
+        timestamp = None if rng.random() < undated else START + rng.randrange(0, 1500) * DAY
+        usernames.add_entry(name, f"https://www.instagram.com/{name}", timestamp)
+    return usernames
+
+class RelationshipResultsTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        people = [f"user{i}" for i in range(3000)] + ["Zed", "ärger", "名前"]
+        self.followers = dated(rng.sample(people, 1800), rng)
+        self.following = dated(rng.sample(people, 1500), rng)
+        self.results = RelationshipResults(self.followers, self.following)
+
+    def test_views_match_set_operations(self):
+        expected = {"Unfollowers": self.following - self.followers, "Fans": self.followers - self.following,
+                    "Mutuals": self.followers & self.following}
+        for mode, names in expected.items():
+            with self.subTest(mode=mode):
+                self.assertEqual(list(self.results.view(mode)), sorted(names))
+        self.assertEqual(list(self.results.followers), sorted(self.followers))
+
+    def test_whitelist_is_left_out_of_every_view(self):
+        whitelist = set(sorted(self.followers | self.following)[::7])
+        results = RelationshipResults(self.followers, self.following, whitelist)
+        self.assertEqual(list(results.whitelisted), sorted(whitelist & (self.followers | self.following)))
+        self.assertEqual(list(results.unfollowers), sorted(self.following - self.followers - whitelist))
+        self.assertEqual(list(results.mutuals), sorted((self.followers & self.following) - whitelist))
+        # Re-applying keeps the table and matches building from scratch
+        rewhitelisted = self.results.with_whitelist(whitelist)
+        self.assertIs(rewhitelisted.table, self.results.table)
+        self.assertEqual(list(rewhitelisted.fans), list(results.fans))
+
+    def test_entry_meta(self):
+        name = sorted(self.followers & self.following)[0]
+        row = list(self.results.table).index(name)
+        followed_you, you_followed, href = self.results.entry_meta(row)
+        self.assertEqual(followed_you, self.followers.meta[name] >> 2)
+        self.assertEqual(you_followed, self.following.meta[name] >> 2)
+        self.assertEqual(href, f"https://www.instagram.com/{name}")
+
+    def test_filter_by_date_matches_a_scan(self):
+        for mode in ("Unfollowers", "Fans", "Mutuals"):
+            for relationship, source in (("followers", self.followers), ("following", self.following)):
+                for start, end in ((None, None), (START + 100 * DAY, None), (None, START + 400 * DAY),
+                                   (START + 200 * DAY, START + 900 * DAY)):
+                    with self.subTest(mode=mode, relationship=relationship, start=start, end=end):
+                        expected = sorted(name for name in self.results.view(mode) if name in source
+                                          and source.meta[name] >> 2
+                                          and (start is None or source.meta[name] >> 2 >= start)
+                                          and (end is None or source.meta[name] >> 2 < end))
+                        self.assertEqual(list(self.results.filter_by_date(mode, relationship, start, end)), expected)
+
+    def test_html_results_have_no_dates(self):
+        results = RelationshipResults({"a", "b"}, {"b", "c"})
+        self.assertEqual(len(results.time_index("followers")), 0)
+        self.assertEqual(list(results.filter_by_date("Fans", "followers")), [])
+        self.assertEqual(results.entry_meta(0), (0, 0, None))
+
+class TimeIndexTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(1)
+        self.times = [rng.choice([0, START + rng.randrange(0, 800) * DAY]) for _ in range(2000)]
+        self.ids = list(range(0, 4000, 2))
+        self.index = TimeIndex(self.ids, [t << 2 | 1 for t in self.times])
+
+    def test_undated_entries_are_left_out(self):
+        self.assertEqual(len(self.index), sum(1 for t in self.times if t))
+        self.assertEqual(list(self.index.times), sorted(t for t in self.times if t))
+
+    def test_counts_and_ranges_match_a_scan(self):
+        for start, end in ((None, None), (START, START + DAY), (START + 50 * DAY, START + 60 * DAY), (START + 900 * DAY, None)):
+            with self.subTest(start=start, end=end):
+                inside = [row for row, t in zip(self.ids, self.times)
+                          if t and (start is None or t >= start) and (end is None or t < end)]
+                self.assertEqual(self.index.count(start, end), len(inside))
+                self.assertEqual(list(self.index.between(start, end)), inside)
+
+    def test_restrict_keeps_only_the_given_ids(self):
+        keep = self.ids[::3]
+        restricted = self.index.restrict(keep)
+        self.assertEqual(sorted(restricted.ids), sorted(row for row, t in zip(self.ids, self.times) if t and row in set(keep)))
+        self.assertEqual(list(restricted.times), sorted(restricted.times))
+        self.assertEqual(len(self.index.restrict([])), 0)
+
+    def test_histogram_buckets_every_entry(self):
+        edges = calendar_edges(self.index.times[0], self.index.times[-1])
+        counts = self.index.histogram(edges)
+        self.assertEqual(sum(counts), len(self.index))
+        self.assertEqual(counts[0], self.index.count(edges[0], edges[1]))
+
+class CalendarEdgesTest(unittest.TestCase):
+    def utc(self, *args):
+        return int(datetime.datetime(*args, tzinfo=datetime.timezone.utc).timestamp())
+
+    def test_month_edges(self):
+        edges = calendar_edges(self.utc(2023, 11, 15, 12), self.utc(2024, 2, 3))
+        self.assertEqual(edges, [self.utc(2023, 11, 1), self.utc(2023, 12, 1), self.utc(2024, 1, 1),
+                                 self.utc(2024, 2, 1), self.utc(2024, 3, 1)])
+
+    def test_year_edges(self):
+        edges = calendar_edges(self.utc(2019, 6, 1), self.utc(2021, 1, 1), unit="year")
+        self.assertEqual(edges, [self.utc(2019, 1, 1), self.utc(2020, 1, 1), self.utc(2021, 1, 1), self.utc(2022, 1, 1)])
+
+    def test_edges_cover_the_range(self):
+        start, end = self.utc(2024, 1, 1), self.utc(2024, 1, 1)
+        edges = calendar_edges(start, end)
+        self.assertLessEqual(edges[0], start)
+        self.assertGreater(edges[-1], end)
+
+if __name__ == "__main__":
+    unittest.main()
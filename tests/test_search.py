@@ -0,0 +1,45 @@
+"""Indexed search checked against a plain substring scan."""
+import re
+import unittest
+
+from ig_engine import NameView, RelationshipResults, SearchIndex
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        following = {f"User{i}.{'ab' * (i % 5)}" for i in range(2000)}
+        followers = {f"user{i}.x" for i in range(0, 2000, 3)}
+        self.results = RelationshipResults(followers, following)
+        self.view = self.results.unfollowers
+
+    def expected(self, query):
+        return [name for name in self.view if query in name.lower()]
+
+    def test_substring_queries_match_a_scan(self):
+        index = SearchIndex(self.view)
+        for query in ("", "u", "us", "user1", "user12", "bab", "r19.", "zzz", "1.abab"):
+            with self.subTest(query=query):
+                self.assertEqual(list(index.search(query)), self.expected(query))
+
+    def test_extending_a_query_narrows_the_previous_matches(self):
+        index = SearchIndex(self.view)
+        for query in ("1", "12", "123", "1234", "12", "user"):
+            with self.subTest(query=query):
+                self.assertEqual(list(index.search(query)), self.expected(query))
+        self.assertEqual(index.last_query, "user")
+
+    def test_regex_queries(self):
+        index = SearchIndex(self.view)
+        for pattern in (r"^user1\d\.ab$", r"(ab){3}", r"9$"):
+            with self.subTest(pattern=pattern):
+                expected = [name for name in self.view if re.search(pattern, name.lower())]
+                self.assertEqual(list(index.search(pattern, regex=True)), expected)
+
+    def test_result_views_stay_name_views(self):
+        matches = SearchIndex(self.view).search("user1")
+        self.assertIsInstance(matches, NameView)
+        self.assertIs(matches.table, self.results.table)
+        self.assertEqual(matches[:3], self.expected("user1")[:3])
+        self.assertEqual(SearchIndex(["Alice", "bob"]).search("a"), ["Alice"])
+
+if __name__ == "__main__":
+    unittest.main()
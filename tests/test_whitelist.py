@@ -0,0 +1,50 @@
+"""The compiled whitelist against checking every rule on its own."""
+import fnmatch
+import random
+import re
+import unittest
+
+from ig_engine import RelationshipResults, WhitelistMatcher
+
+def brute_force(rules, name):
+    for rule in rules:
+        rule = rule.strip()
+        if not rule or rule.startswith("#"):
+            continue
+        if rule.startswith("re:"):
+            if re.fullmatch(rule[3:], name):
+                return True
+        elif fnmatch.fnmatchcase(name, rule):
+            return True
+    return False
+
+class WhitelistMatcherTest(unittest.TestCase):
+    def test_matches_rule_by_rule_check(self):
+        rng = random.Random(0)
+        rules = (["# comment", "", "alice", "bob.smith"] + [f"brand{i}*" for i in range(50)] + [f"*_off{i}" for i in range(50)]
+                 + ["shop_??", "x[ab]y", "a*b*c", "*mid*", r"re:bot\d+", "re:(?i)caps", r"re:(a)b", r"re:(\w)\1", "re:(?P<x>q)(?P=x)"])
+        matcher = WhitelistMatcher(rules)
+        names = ["alice", "alicex", "brand7", "brand", "xbrand3", "z_off4", "_off49", "shop_ab", "shop_abc", "xay", "xcy",
+                 "aXbYc", "amidz", "bot12", "bot", "CAPS", "Caps", "ab", "zz", "zy", "qq", "q"]
+        names += ["".join(rng.choice("abcdorfxyz_0123456789") for _ in range(rng.randrange(1, 9))) for _ in range(2000)]
+        for name in names:
+            with self.subTest(name=name):
+                self.assertEqual(bool(matcher.matches(name)), brute_force(rules, name))
+        self.assertEqual(len(matcher), len(rules) - 2)
+
+    def test_invalid_rules_raise_value_error(self):
+        for rules in (["re:(("], ["re:a(?i)b"], ["ok", "re:[z-a]"]):
+            with self.subTest(rules=rules), self.assertRaises(ValueError):
+                WhitelistMatcher(rules)
+
+    def test_results_apply_and_swap_whitelists(self):
+        results = RelationshipResults({"a", "brand_x", "fan"}, {"a", "brand_y", "gone", "x_official"}, WhitelistMatcher(["brand*"]))
+        self.assertEqual(list(results.unfollowers), ["gone", "x_official"])
+        self.assertEqual(list(results.fans), ["fan"])
+        swapped = results.with_whitelist(WhitelistMatcher(["*_official"]))
+        self.assertEqual(list(swapped.unfollowers), ["brand_y", "gone"])
+        self.assertEqual(list(results.unfollowers), ["gone", "x_official"])
+        self.assertEqual(list(RelationshipResults({"a"}, {"b", "c"}, {"c"}).unfollowers), ["b"])
+
+if __name__ == "__main__":
+    unittest.main()